@@ -0,0 +1,568 @@
+import sys
+import cv2 as cv
+import numpy as np
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from json import dump, load, loads
+from os import makedirs
+from os.path import abspath, dirname, isfile, join
+from subprocess import run
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from tracemalloc import start, stop, get_traced_memory
+from typing import Callable
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from motion_decipher import (
+    logger,
+    VideoFrameSource,
+    normalize_3d,
+    quest_3_correlation,
+    run_motion_decipher,
+    extract_triangles,
+    get_layout,
+    HandPoseEstimator
+)
+from motion_decipher.keypad import META_QUEST_3_KEYPAD
+
+
+"""
+Change the variable BENCHMARK_OUTPUT_FILE to the relative path of the JSON
+report written by each run.
+
+Change the variable BASELINE_FILE to the relative path of the stored baseline
+report. Run the script with --save-baseline to overwrite it with the results
+of the current run. Add --portable to keep only the fields that do not depend
+on the machine (candidate counts, hit rates, loaded modules and agreement
+checks); the committed baseline is saved this way, so throughput and peak
+memory are only compared against a baseline saved on the same machine.
+
+Change the variable REGRESSION_TOLERANCE to the fraction by which a benchmark
+may be slower, or use more peak memory, than the baseline before it is flagged.
+
+Change the variables PIN_LENGTHS, TRACKS_PER_LENGTH and TRACK_NOISE to shape
+the synthetic point tracks fed to the correlation stages. Tracks are generated
+from the keypad key positions with uniform noise, seeded by RANDOM_SEED.
+
+Change the variable CORRELATION_WORKERS to the number of processes used by
+the parallel correlation benchmark, run for every PIN length of at least
+PARALLEL_MIN_LENGTH, or 0 to skip it.
+
+Change the variables KEYPAD_ANGLE_REGION and KEYPAD_DISTANCE_REGION to the
+ambiguity regions used by Keypad.infer_candidates, and KEYPAD_BEAM_WIDTH to
+bound its search (None for an exhaustive search).
+
+Change the variables POSE_FRAMES and VIDEO_FRAMES to the number of generated
+frames used by the pose estimation and end-to-end benchmarks.
+
+Change the variables TRACKING_WINDOWS and TRACKING_WINDOW_FRAMES to the number
+and length of the press windows used by the tracking benchmarks, and
+TRACKING_VIDEO to a real video to take their frames from (None for generated
+frames). pose_tracking estimates every frame of each window, while
+extract_triangles_tracking runs the extraction path, which stops at the first
+detection of each window.
+
+Change the variable IMPORT_REPEATS to the number of fresh interpreters the
+package import is timed in, and HEAVY_MODULES to the modules that importing
+the package must not load on its own.
+
+Change the variables MIN_DURATION and MIN_REPEATS to the minimum number of
+seconds and calls each benchmark is timed over. Throughput is taken from the
+median call, and peak memory from one separate traced call.
+"""
+BENCHMARK_OUTPUT_FILE: str = "./output/benchmark.json"
+BASELINE_FILE: str = "./benchmarks/baseline.json"
+REGRESSION_TOLERANCE: float = 0.25
+PIN_LENGTHS: list[int] = list(range(4, 13))
+TRACKS_PER_LENGTH: int = 8
+TRACK_NOISE: float = 0.05
+RANDOM_SEED: int = 0
+CORRELATION_WORKERS: int = 4
+PARALLEL_MIN_LENGTH: int = 8
+KEYPAD_ANGLE_REGION: float = 15.0
+KEYPAD_DISTANCE_REGION: tuple[float, float] = (0.3, 0.3)
+KEYPAD_BEAM_WIDTH: int | None = 4096
+POSE_FRAMES: int = 32
+VIDEO_FRAMES: int = 90
+TRACKING_WINDOWS: int = 4
+TRACKING_WINDOW_FRAMES: int = 8
+TRACKING_VIDEO: str | None = None
+IMPORT_REPEATS: int = 5
+HEAVY_MODULES: tuple[str, ...] = ("cv2", "mediapipe")
+MIN_DURATION: float = 0.5
+MIN_REPEATS: int = 5
+
+BenchmarkResult = dict[str, float | int | str | None]
+
+__PORTABLE_FIELDS: tuple[str, ...] = (
+    "mean_candidates",
+    "max_candidates",
+    "hit_rate",
+    "detection_agreement",
+    "heavy_modules",
+    "matches_serial",
+    "matches_static",
+)
+
+def __measure__(function: Callable[[], object], num_ops: int = 1) -> BenchmarkResult:
+    function()
+
+    durations: list[float] = []
+    start_time = perf_counter()
+    while len(durations) < MIN_REPEATS or perf_counter() - start_time < MIN_DURATION:
+        call_time = perf_counter()
+        function()
+        durations.append(perf_counter() - call_time)
+
+    start()
+    function()
+    _, peak_bytes = get_traced_memory()
+    stop()
+
+    return {
+        "ops_per_sec": num_ops / float(np.median(durations)),
+        "peak_bytes": peak_bytes,
+    }
+
+def __import_package__(trace: bool) -> tuple[float, int, list[str]]:
+    script = "\n".join([
+        "import sys",
+        "from json import dumps",
+        "from time import perf_counter",
+        "from tracemalloc import start, get_traced_memory",
+        f"sys.path.insert(0, {dirname(dirname(abspath(__file__)))!r})",
+        "start()" if trace else "",
+        "start_time = perf_counter()",
+        "import motion_decipher",
+        "duration = perf_counter() - start_time",
+        "print(dumps([",
+        "    duration,",
+        f"    get_traced_memory()[1] if {trace} else 0,",
+        f"    [name for name in {HEAVY_MODULES!r} if name in sys.modules]",
+        "]))",
+    ])
+
+    process = run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return tuple(loads(process.stdout.strip().splitlines()[-1]))
+
+def bench_import(_: np.random.Generator) -> dict[str, BenchmarkResult]:
+    durations = [__import_package__(False)[0] for _ in range(IMPORT_REPEATS)]
+    _, peak_bytes, heavy_modules = __import_package__(True)
+
+    return {
+        "import_motion_decipher": {
+            "ops_per_sec": 1.0 / float(np.median(durations)),
+            "peak_bytes": peak_bytes,
+            "heavy_modules": ",".join(heavy_modules),
+        },
+    }
+
+def __synthetic_tracks__(
+    key_positions: list[tuple[float, float]],
+    characters: str,
+    pin_length: int,
+    rng: np.random.Generator
+) -> list[tuple[str, list[tuple[float, float]]]]:
+    tracks: list[tuple[str, list[tuple[float, float]]]] = []
+
+    for _ in range(TRACKS_PER_LENGTH):
+        keys = rng.integers(0, len(key_positions), pin_length)
+        noise = rng.uniform(-TRACK_NOISE, TRACK_NOISE, (pin_length, 2))
+
+        tracks.append((
+            "".join([characters[key] for key in keys]),
+            [
+                (key_positions[key][0] + dx, key_positions[key][1] + dy)
+                for key, (dx, dy) in zip(keys, noise)
+            ]
+        ))
+
+    return tracks
+
+def __candidate_stats__(
+    tracks: list[tuple[str, list[tuple[float, float]]]],
+    infer: Callable[[list[tuple[float, float]]], list[str]]
+) -> BenchmarkResult:
+    counts: list[int] = []
+    num_hits: int = 0
+
+    for pin, points in tracks:
+        candidates = infer(points)
+        counts.append(len(candidates))
+        num_hits += pin in candidates
+
+    return {
+        "mean_candidates": float(np.mean(counts)),
+        "max_candidates": int(np.max(counts)),
+        "hit_rate": num_hits / len(tracks),
+    }
+
+def bench_correlation(rng: np.random.Generator) -> dict[str, BenchmarkResult]:
+    layout = get_layout("quest_3")
+    results: dict[str, BenchmarkResult] = {}
+
+    for pin_length in PIN_LENGTHS:
+        tracks = __synthetic_tracks__(
+            list(layout.get_key_positions()),
+            layout.get_characters(),
+            pin_length,
+            rng
+        )
+        infer = lambda points : quest_3_correlation(points)
+
+        results[f"quest_3_correlation/{pin_length}"] = {
+            **__measure__(lambda : [infer(points) for _, points in tracks], len(tracks)),
+            **__candidate_stats__(tracks, infer),
+        }
+
+    return results
+
+def bench_parallel_correlation(rng: np.random.Generator) -> dict[str, BenchmarkResult]:
+    layout = get_layout("quest_3")
+    results: dict[str, BenchmarkResult] = {}
+
+    if CORRELATION_WORKERS <= 0:
+        return results
+
+    with ProcessPoolExecutor(CORRELATION_WORKERS) as executor:
+        for pin_length in PIN_LENGTHS:
+            tracks = __synthetic_tracks__(
+                list(layout.get_key_positions()),
+                layout.get_characters(),
+                pin_length,
+                rng
+            )
+
+            if pin_length < PARALLEL_MIN_LENGTH:
+                continue
+
+            infer = lambda points : quest_3_correlation(points, executor=executor)
+
+            results[f"quest_3_correlation_parallel/{pin_length}"] = {
+                **__measure__(lambda : [infer(points) for _, points in tracks], len(tracks)),
+                **__candidate_stats__(tracks, infer),
+                "matches_serial": all(
+                    infer(points) == quest_3_correlation(points) for _, points in tracks
+                ),
+            }
+
+    return results
+
+def bench_keypad(rng: np.random.Generator) -> dict[str, BenchmarkResult]:
+    keys = META_QUEST_3_KEYPAD.get_keys()
+    results: dict[str, BenchmarkResult] = {}
+
+    for pin_length in PIN_LENGTHS:
+        tracks = __synthetic_tracks__(
+            [key.get_center() for key in keys],
+            "".join([key.get_character() for key in keys]),
+            pin_length,
+            rng
+        )
+        infer = lambda points : META_QUEST_3_KEYPAD.infer_candidates(
+            points,
+            KEYPAD_ANGLE_REGION,
+            KEYPAD_DISTANCE_REGION,
+            KEYPAD_BEAM_WIDTH
+        )
+
+        results[f"keypad_infer_candidates/{pin_length}"] = {
+            **__measure__(lambda : [infer(points) for _, points in tracks], len(tracks)),
+            **__candidate_stats__(tracks, infer),
+        }
+
+    return results
+
+def bench_normalize(rng: np.random.Generator) -> dict[str, BenchmarkResult]:
+    points = [tuple(point) for point in rng.uniform(0.0, 1.0, (max(PIN_LENGTHS), 3)).tolist()]
+
+    return {
+        "normalize_3d": __measure__(lambda : normalize_3d(points)),
+    }
+
+def __generate_frames__(
+    num_frames: int,
+    rng: np.random.Generator,
+    width: int = 320,
+    height: int = 240
+) -> list[np.ndarray]:
+    frames: list[np.ndarray] = []
+
+    for frame_idx in range(num_frames):
+        frame = np.full((height, width, 3), 32, dtype=np.uint8)
+        x = int((width - 64) * frame_idx / max(1, num_frames - 1))
+        y = int(rng.integers(0, height - 64))
+
+        frame[y:y + 64, x:x + 64] = (200, 160, 140)
+        frames.append(frame)
+
+    return frames
+
+def bench_pose_estimation(rng: np.random.Generator) -> dict[str, BenchmarkResult]:
+    frames = __generate_frames__(POSE_FRAMES, rng)
+
+    with HandPoseEstimator() as estimator:
+        results = __measure__(lambda : list(estimator.estimate(frames)), len(frames))
+
+    return {
+        "pose_estimation": results,
+    }
+
+def __estimate_windows__(
+    estimator: HandPoseEstimator,
+    windows: list[list[np.ndarray]]
+) -> list[tuple[tuple[float, float, float], ...] | None]:
+    estimator.reset()
+
+    landmarks = []
+    for window in windows:
+        estimator.reset_tracking()
+        landmarks.extend(estimator.estimate_landmarks(window))
+
+    return landmarks
+
+def bench_tracking(rng: np.random.Generator) -> dict[str, BenchmarkResult]:
+    num_frames = TRACKING_WINDOWS * TRACKING_WINDOW_FRAMES
+
+    if TRACKING_VIDEO is None:
+        frames = __generate_frames__(num_frames, rng)
+    else:
+        with VideoFrameSource(TRACKING_VIDEO) as frame_source:
+            frames = [frame for _, frame in frame_source.window(0, num_frames - 1)]
+
+    windows = [
+        frames[frame_idx:frame_idx + TRACKING_WINDOW_FRAMES]
+        for frame_idx in range(0, len(frames), TRACKING_WINDOW_FRAMES)
+    ]
+
+    with HandPoseEstimator() as static_estimator, HandPoseEstimator(tracking=True) as tracking_estimator:
+        static_result = __measure__(
+            lambda : __estimate_windows__(static_estimator, windows),
+            len(frames)
+        )
+        tracking_result = __measure__(
+            lambda : __estimate_windows__(tracking_estimator, windows),
+            len(frames)
+        )
+
+        static_landmarks = __estimate_windows__(static_estimator, windows)
+        tracking_landmarks = __estimate_windows__(tracking_estimator, windows)
+
+    num_agreements: int = 0
+    errors: list[float] = []
+    for static_frame, tracking_frame in zip(static_landmarks, tracking_landmarks):
+        num_agreements += (static_frame is None) == (tracking_frame is None)
+
+        if static_frame is not None and tracking_frame is not None:
+            errors.append(float(np.abs(
+                np.array(static_frame)[:, :2] - np.array(tracking_frame)[:, :2]
+            ).mean()))
+
+    return {
+        "pose_tracking": {
+            **tracking_result,
+            "static_ops_per_sec": static_result["ops_per_sec"],
+            "speedup": tracking_result["ops_per_sec"] / static_result["ops_per_sec"],
+            "detection_agreement": num_agreements / len(frames),
+            "mean_landmark_error": float(np.mean(errors)) if len(errors) > 0 else None,
+        },
+    }
+
+def __write_video__(video_path: str, frames: list[np.ndarray]):
+    video_writer = cv.VideoWriter(
+        video_path,
+        cv.VideoWriter_fourcc(*"mp4v"),
+        30.0,
+        (frames[0].shape[1], frames[0].shape[0])
+    )
+    for frame in frames:
+        video_writer.write(cv.cvtColor(frame, cv.COLOR_RGB2BGR))
+    video_writer.release()
+
+def bench_tracking_extraction(rng: np.random.Generator) -> dict[str, BenchmarkResult]:
+    num_frames = TRACKING_WINDOWS * TRACKING_WINDOW_FRAMES
+    presses: list[tuple[int, int]] = [
+        (frame_idx, frame_idx + TRACKING_WINDOW_FRAMES - 1)
+        for frame_idx in range(0, num_frames, TRACKING_WINDOW_FRAMES)
+    ]
+
+    with TemporaryDirectory() as video_folder:
+        video_path = TRACKING_VIDEO
+        if video_path is None:
+            video_path = join(video_folder, "tracking.mp4")
+            __write_video__(video_path, __generate_frames__(num_frames, rng))
+
+        with HandPoseEstimator() as static_estimator, HandPoseEstimator(tracking=True) as tracking_estimator:
+            static_result = __measure__(
+                lambda : extract_triangles(video_path, presses, static_estimator),
+                len(presses)
+            )
+            tracking_result = __measure__(
+                lambda : extract_triangles(video_path, presses, tracking_estimator),
+                len(presses)
+            )
+
+            static_triangles = extract_triangles(video_path, presses, static_estimator)
+            tracking_triangles = extract_triangles(video_path, presses, tracking_estimator)
+
+    return {
+        "extract_triangles_tracking": {
+            **tracking_result,
+            "static_ops_per_sec": static_result["ops_per_sec"],
+            "speedup": tracking_result["ops_per_sec"] / static_result["ops_per_sec"],
+            "matches_static": [
+                (triangle.get_x(), triangle.get_y(), triangle.get_area())
+                for triangle in static_triangles
+            ] == [
+                (triangle.get_x(), triangle.get_y(), triangle.get_area())
+                for triangle in tracking_triangles
+            ],
+        },
+    }
+
+def bench_end_to_end(rng: np.random.Generator) -> dict[str, BenchmarkResult]:
+    frames = __generate_frames__(VIDEO_FRAMES, rng)
+    presses: list[tuple[int, int]] = [
+        (press_min, press_min + 4)
+        for press_min in range(0, VIDEO_FRAMES - 4, VIDEO_FRAMES // 4)
+    ]
+
+    with TemporaryDirectory() as video_folder:
+        video_path = join(video_folder, "1234.mp4")
+
+        __write_video__(video_path, frames)
+
+        with HandPoseEstimator() as estimator:
+            results = __measure__(lambda : run_motion_decipher(
+                video_path,
+                "1234",
+                presses,
+                90.0,
+                estimator
+            ))
+
+    return {
+        "run_motion_decipher": results,
+    }
+
+def compare_to_baseline(
+    results: dict[str, BenchmarkResult],
+    baseline: dict[str, BenchmarkResult]
+) -> list[str]:
+    regressions: list[str] = []
+
+    for name, result in results.items():
+        if name not in baseline or "error" in result or "error" in baseline[name]:
+            continue
+
+        expected = baseline[name]
+
+        if "ops_per_sec" in expected and (
+            result["ops_per_sec"] < expected["ops_per_sec"] * (1.0 - REGRESSION_TOLERANCE)
+        ):
+            regressions.append(
+                f"{name}: {result['ops_per_sec']:.2f} ops/sec "
+                f"(baseline {expected['ops_per_sec']:.2f})"
+            )
+
+        if "peak_bytes" in expected and (
+            result["peak_bytes"] > expected["peak_bytes"] * (1.0 + REGRESSION_TOLERANCE)
+        ):
+            regressions.append(
+                f"{name}: {result['peak_bytes']} peak bytes "
+                f"(baseline {expected['peak_bytes']})"
+            )
+
+        for key in __PORTABLE_FIELDS:
+            if key in expected and result.get(key) != expected[key]:
+                regressions.append(
+                    f"{name}: {key} {result.get(key)} (baseline {expected[key]})"
+                )
+
+    return regressions
+
+def portable_results(results: dict[str, BenchmarkResult]) -> dict[str, BenchmarkResult]:
+    portable: dict[str, BenchmarkResult] = {}
+
+    for name, result in results.items():
+        fields = { key: value for key, value in result.items() if key in __PORTABLE_FIELDS }
+        if "error" not in result and len(fields) > 0:
+            portable[name] = fields
+
+    return portable
+
+def main() -> int:
+    parser = ArgumentParser(description="Benchmark every MotionDecipher stage on synthetic inputs.")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--portable", action="store_true")
+    parser.add_argument("--output", default=BENCHMARK_OUTPUT_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    arguments = parser.parse_args()
+
+    results: dict[str, BenchmarkResult] = {}
+    for benchmark in (
+        bench_import,
+        bench_correlation,
+        bench_parallel_correlation,
+        bench_keypad,
+        bench_normalize,
+        bench_pose_estimation,
+        bench_tracking,
+        bench_tracking_extraction,
+        bench_end_to_end,
+    ):
+        logger.log_info(f"Running {benchmark.__name__}...")
+
+        try:
+            results.update(benchmark(np.random.default_rng(RANDOM_SEED)))
+        except Exception as e:
+            logger.log_warning(f"Skipping {benchmark.__name__}, {e}...")
+            results[benchmark.__name__] = { "error": str(e) }
+
+    report = {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "results": results,
+    }
+
+    output_folder = dirname(arguments.output)
+    if output_folder != "":
+        makedirs(output_folder, exist_ok=True)
+
+    with open(arguments.output, "w") as output_file:
+        dump(report, output_file, indent=2)
+
+    logger.log_info(f"Wrote Benchmark Results To {arguments.output}.")
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, "w") as baseline_file:
+            dump(
+                { **report, "results": portable_results(results) } if arguments.portable else report,
+                baseline_file,
+                indent=2
+            )
+
+        logger.log_success(f"Saved Baseline To {arguments.baseline}.")
+        return 0
+
+    if not isfile(arguments.baseline):
+        logger.log_warning(f"No Baseline At {arguments.baseline}, Run With --save-baseline.")
+        return 0
+
+    with open(arguments.baseline, "r") as baseline_file:
+        baseline = load(baseline_file)
+
+    regressions = compare_to_baseline(results, baseline["results"])
+    for regression in regressions:
+        logger.log_error(f"Regression {regression}")
+
+    if len(regressions) > 0:
+        return 1
+
+    logger.log_success("No Regressions Against Baseline!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,30 @@
-from os import mkdir, listdir
-from os.path import join, isdir
-from multiprocessing import Pool
-from motion_decipher import run_motion_decipher, logger
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from json import dumps
+from os import mkdir, listdir, remove
+from os.path import join, isdir, getsize
+from multiprocessing import queues
+from time import perf_counter
+from typing import Generator, Iterable, TextIO
+from motion_decipher import (
+    iter_motion_decipher,
+    evaluate_motion_decipher,
+    logger,
+    metrics,
+    MetricsRecord,
+    HandPoseEstimator,
+    InferencePipeline,
+    LandmarkCache,
+    PressManifest,
+    RunManifest,
+    ResultsStore,
+    CandidateSpool,
+    inputs_digest,
+    file_digest,
+    ImageSequenceFrameSource,
+    get_transition_masks,
+    set_table_folder
+)
 
 
 """
@@ -20,86 +43,618 @@ Change the variable VIEWING_ANGLE to alter the test(s) horizontal angle.
 
 Change the variable MAX_PROCESSES to the value of 1 for a standard synchronous
 single-process run, or larger if you'd like to run numerous tests at a time.
+Videos are scheduled largest first so long cases do not hold up the end of
+the batch. If a worker process dies, the cases it may have been running are
+retried one at a time, and a case that kills its worker again is recorded as
+failed while the rest of the batch continues.
+
+Change the variable MAX_TASKS_PER_CHILD to the number of videos a worker
+handles before it is replaced by a fresh process, or None to keep workers
+alive for the whole batch.
+
+Change the variable PIPELINE_WORKERS to the number of inference processes
+used per video during a single-process run, or 0 to decode and infer on
+one thread.
+
+Change the variable LANDMARK_CACHE_PATH to the file used to cache hand
+landmarks between runs, or None to always re-run pose estimation. The cache
+is trimmed to LANDMARK_CACHE_MAX_BYTES, oldest entries first.
+
+Change the variable PRESS_MANIFEST_PATH to the file indexing the press
+windows of every case in the 'keypresses' folder. Only cases whose folders
+changed since the last run are rescanned. Set it to None to rescan every run.
+
+Change the variable USE_EXTRACTED_FRAMES to True to read each press window
+from the JPEG frames in the 'keypresses' folder instead of decoding the
+video. FRAME_REDUCTION decodes those frames at 1/1, 1/2, 1/4 or 1/8 size, and
+FRAME_READ_THREADS sets how many frames are decoded in parallel.
+
+Change the variable LOG_LEVEL to the lowest level printed (logger.INFO,
+logger.SUCCESS, logger.WARNING or logger.ERROR). Set LOG_JSON to True to print
+one JSON object per line, and LOG_FILE to a file that also receives every log
+line, or None. Worker processes send their log records to a single writer
+thread in the main process.
+
+Change the variable HAND_ROI_PADDING to crop each frame to a box around the
+previous hand detection, grown by this fraction of the hand size on every side,
+before running MediaPipe. Frames where the crop misses are re-run on the full
+frame. Set it to None to always use the full frame. Cropping requires
+PIPELINE_WORKERS to be 0.
+
+Change the variable INFERENCE_SCALE to the factor frames (or crops) are
+downscaled by before MediaPipe, or 1.0 to keep the full resolution.
+
+Change the variable MIN_DETECTION_CONFIDENCE to the MediaPipe palm detection
+threshold.
+
+Change the variable METRICS_ENABLED to True to time each stage (seek, decode,
+convert, inference, extraction, reconstruction, correlation) and count frames,
+missed detections and candidates for every case. One JSON line per case and a
+final batch summary line are written to METRICS_FILE (None to only log the
+summary).
+
+Change the variable KEYPAD_LAYOUT to the name of the registered keypad
+layout ('quest_3', 'phone' or 'atm') the hand motion is correlated against.
+
+Change the variable LAYOUT_TABLE_FOLDER to the directory holding the compiled
+keypad transition tables, or None to compile them in memory on every run.
+
+Change the variable DELTA_T to the angle tolerance, in degrees, used when
+correlating hand motion against the keypad.
+
+Change the variable RUN_MANIFEST_PATH to the file recording every finished
+case with the hashes of its inputs and its output location. Reruns skip cases
+whose video, press windows and settings are unchanged, and redo stale or
+failed ones. Set it to None to always process every case.
+
+Change the variable RESULTS_STORE_PATH to the database collecting every case's
+candidate count, target rank, timings and packed candidates, or None to write
+one text file of candidates per PIN to OUTPUT_FOLDER instead.
+
+Change the variable RESULTS_BATCH_SIZE to the number of finished cases
+buffered before they are written to the results store together, and between
+saves of the run manifest.
+
+Change the variable RESULTS_CHUNK_SIZE to the number of packed candidates a
+worker buffers before appending them to its case's spool file in OUTPUT_FOLDER,
+and per row when the spools are copied into the results store.
+
+Change the variable EXPORT_TEXT to True to also export the stored candidates
+as one text file per PIN to OUTPUT_FOLDER once the batch finishes.
+
+Change the variable MAX_CANDIDATES to cap the number of candidates written
+for each PIN, or None to write every candidate.
+
+Change the variable COUNT_ONLY to True to only log the number of candidates
+and whether the PIN is among them, without enumerating or writing them.
 """
 TEST_CASE_FOLDER: str = "./tests"
 TEST_CASE_FILE: str | None = None
 OUTPUT_FOLDER: str = "./output"
 VIEWING_ANGLE: float = 90.0
 MAX_PROCESSES: int = 10
+MAX_TASKS_PER_CHILD: int | None = 8
+PIPELINE_WORKERS: int = 0
+LANDMARK_CACHE_PATH: str | None = "./.landmark_cache.sqlite"
+LANDMARK_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+PRESS_MANIFEST_PATH: str | None = "./.press_manifest.json"
+USE_EXTRACTED_FRAMES: bool = False
+FRAME_REDUCTION: int = 2
+FRAME_READ_THREADS: int = 4
+LOG_LEVEL: int = logger.INFO
+LOG_JSON: bool = False
+LOG_FILE: str | None = None
+HAND_ROI_PADDING: float | None = None
+INFERENCE_SCALE: float = 1.0
+MIN_DETECTION_CONFIDENCE: float = 0.3
+METRICS_ENABLED: bool = False
+METRICS_FILE: str | None = "./output/metrics.jsonl"
+KEYPAD_LAYOUT: str = "quest_3"
+LAYOUT_TABLE_FOLDER: str | None = "./.layout_tables"
+DELTA_T: float = 14.5
+RUN_MANIFEST_PATH: str | None = "./output/run_manifest.json"
+RESULTS_STORE_PATH: str | None = "./output/results.sqlite"
+RESULTS_BATCH_SIZE: int = 64
+RESULTS_CHUNK_SIZE: int = 65536
+EXPORT_TEXT: bool = False
+MAX_CANDIDATES: int | None = None
+COUNT_ONLY: bool = False
+
+__estimator: HandPoseEstimator | None = None
+__pipeline: InferencePipeline | None = None
+__cache: LandmarkCache | None = None
+
+def __init_worker__(log_queue: queues.Queue | None = None, log_level: int = logger.INFO):
+    global __estimator, __cache
+
+    if log_queue is not None:
+        logger.set_queue(log_queue, log_level)
+
+    metrics.enable(METRICS_ENABLED)
+    set_table_folder(LAYOUT_TABLE_FOLDER)
+    get_transition_masks(KEYPAD_LAYOUT)
+
+    if __estimator is None:
+        __estimator = HandPoseEstimator(
+            min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+            roi_padding=HAND_ROI_PADDING,
+            inference_scale=INFERENCE_SCALE
+        )
+
+    if __cache is None and LANDMARK_CACHE_PATH is not None:
+        __cache = LandmarkCache(LANDMARK_CACHE_PATH, LANDMARK_CACHE_MAX_BYTES)
+
+def __decipher_case__(
+    videos_path: str,
+    keypresses_path: str,
+    video_filename: str,
+    target_sequence: str,
+    presses: list[tuple[int, int]]
+) -> tuple[bool, int, int | None, str | None, int]:
+    frame_source: ImageSequenceFrameSource | None = None
+    if USE_EXTRACTED_FRAMES:
+        frame_source = ImageSequenceFrameSource(
+            join(keypresses_path, target_sequence),
+            FRAME_REDUCTION,
+            FRAME_READ_THREADS
+        )
+
+    try:
+        if COUNT_ONLY:
+            num_candidates, is_success = evaluate_motion_decipher(
+                join(videos_path, video_filename),
+                target_sequence,
+                presses,
+                VIEWING_ANGLE,
+                __estimator,
+                __pipeline,
+                __cache,
+                DELTA_T,
+                layout=KEYPAD_LAYOUT,
+                frame_source=frame_source
+            )
+
+            return is_success, num_candidates, None, None, 0
+
+        candidates = iter_motion_decipher(
+            join(videos_path, video_filename),
+            target_sequence,
+            presses,
+            VIEWING_ANGLE,
+            __estimator,
+            __pipeline,
+            __cache,
+            DELTA_T,
+            max_candidates=MAX_CANDIDATES,
+            layout=KEYPAD_LAYOUT,
+            frame_source=frame_source
+        )
+
+        out_file: TextIO | None = None
+        spool: CandidateSpool | None = None
+        if RESULTS_STORE_PATH is None:
+            output_path = join(OUTPUT_FOLDER, target_sequence + ".txt")
+            out_file = open(output_path, "w")
+        else:
+            output_path = join(OUTPUT_FOLDER, target_sequence + ".spool")
+            spool = CandidateSpool(output_path, RESULTS_CHUNK_SIZE)
+
+        num_candidates: int = 0
+        candidate_length: int = 0
+        rank: int | None = None
+        try:
+            for candidate in candidates:
+                num_candidates += 1
+                candidate_length = len(candidate)
+                if rank is None and candidate == target_sequence:
+                    rank = num_candidates
+
+                if out_file is not None:
+                    out_file.write(candidate + "\n")
+                else:
+                    spool.write(candidate)
+        except BaseException:
+            if out_file is not None:
+                out_file.close()
+            else:
+                spool.close()
+
+            remove(output_path)
+            raise
+    finally:
+        if frame_source is not None:
+            frame_source.close()
+
+    is_success: bool = rank is not None
+
+    if out_file is not None:
+        if not is_success:
+            out_file.seek(0)
+            out_file.truncate()
+        out_file.close()
+    else:
+        spool.close()
+
+    if not is_success:
+        logger.log_error(f"Failure Case {target_sequence}...")
+    else:
+        logger.log_success(f"Success Case {target_sequence}!")
+
+    return (
+        is_success,
+        num_candidates,
+        rank,
+        output_path if spool is not None else None,
+        candidate_length
+    )
+
+def __case_inputs__(presses: list[tuple[int, int]]) -> str:
+    return inputs_digest({
+        "presses": presses,
+        "view_angle": VIEWING_ANGLE,
+        "delta_t": DELTA_T,
+        "layout": KEYPAD_LAYOUT,
+        "max_candidates": MAX_CANDIDATES,
+        "count_only": COUNT_ONLY,
+        "use_extracted_frames": USE_EXTRACTED_FRAMES,
+        "frame_reduction": FRAME_REDUCTION if USE_EXTRACTED_FRAMES else None,
+        "hand_roi_padding": HAND_ROI_PADDING,
+        "inference_scale": INFERENCE_SCALE,
+        "min_detection_confidence": MIN_DETECTION_CONFIDENCE,
+    })
 
 def handle_proc(
     videos_path: str,
     keypresses_path: str,
-    video_filename: str
-):
+    video_filename: str,
+    presses: list[tuple[int, int]]
+) -> MetricsRecord:
+    target_sequence = video_filename.replace(".mp4", "").strip()
     if not video_filename.endswith(".mp4"):
-            return
+            return { "pin": target_sequence, "success": False, "status": "skipped" }
+
+    video_path = join(videos_path, video_filename)
+    is_success: bool = False
+    num_candidates: int = 0
+    rank: int | None = None
+    spool_path: str | None = None
+    candidate_length: int = 0
+    video_digest: str | None = None
+    error: str | None = None
+
+    metrics.reset()
+    start_time = perf_counter()
+
+    try:
+        __init_worker__()
+
+        video_digest = (
+            __cache.video_hash(video_path) if __cache is not None
+            else file_digest(video_path)
+        )
+
+        with metrics.timer("total"):
+            (
+                is_success,
+                num_candidates,
+                rank,
+                spool_path,
+                candidate_length
+            ) = __decipher_case__(
+                videos_path,
+                keypresses_path,
+                video_filename,
+                target_sequence,
+                presses
+            )
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        logger.log_error(f"Crashed Case {target_sequence}, {error}...")
+
+    if COUNT_ONLY:
+        output_path = RESULTS_STORE_PATH
+    elif RESULTS_STORE_PATH is None:
+        output_path = join(OUTPUT_FOLDER, target_sequence + ".txt")
+    else:
+        output_path = RESULTS_STORE_PATH
+
+    return {
+        "pin": target_sequence,
+        "success": is_success,
+        "status": "done" if error is None else "error",
+        "error": error,
+        "num_candidates": num_candidates,
+        "rank": rank,
+        "spool_path": spool_path,
+        "candidate_length": candidate_length,
+        "elapsed": perf_counter() - start_time,
+        "video_digest": video_digest,
+        "output": output_path,
+        **metrics.snapshot(),
+    }
 
+CaseJob = tuple[str, str, str, list[tuple[int, int]]]
+
+def __failed_record__(job: CaseJob, error: str) -> MetricsRecord:
+    _, _, video_filename, _ = job
     target_sequence = video_filename.replace(".mp4", "").strip()
-    video_keypresses_path: str = join(keypresses_path, target_sequence)
 
-    presses: list[tuple[int, int]] = []
-    for idx in range(1, len(target_sequence) + 1):
-        min_idx = 999_999_999
-        max_idx = -999_999_999
+    logger.log_error(f"Crashed Case {target_sequence}, {error}...")
+
+    return {
+        "pin": target_sequence,
+        "success": False,
+        "status": "error",
+        "error": error,
+        "num_candidates": 0,
+        "rank": None,
+        "candidate_length": 0,
+        "elapsed": 0.0,
+        "video_digest": None,
+        "output": None,
+        "timers": {},
+        "counters": {},
+    }
+
+def __worker_pool__(num_workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=num_workers,
+        initializer=__init_worker__,
+        initargs=(logger.get_queue(), logger.get_level()),
+        max_tasks_per_child=MAX_TASKS_PER_CHILD
+    )
+
+def __run_pool__(jobs: list[CaseJob]) -> Generator[MetricsRecord, None, None]:
+    pending: deque[CaseJob] = deque(jobs)
+    suspects: deque[CaseJob] = deque()
+
+    while len(pending) > 0 or len(suspects) > 0:
+        if len(suspects) > 0:
+            job = suspects.popleft()
 
-        cur_press_path: str = join(video_keypresses_path, str(idx))
-        for press_img in listdir(cur_press_path):
-            if not press_img.endswith(".jpg"):
-                continue
+            with __worker_pool__(1) as process_pool:
+                future = process_pool.submit(handle_proc, *job)
 
-            img_idx = int(press_img.replace(".jpg", "").strip())
-            min_idx = min(min_idx, img_idx)
-            max_idx = max(max_idx, img_idx)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield __failed_record__(job, f"{type(e).__name__}: {e}")
 
-        if min_idx > max_idx:
             continue
 
-        presses.append((min_idx, max_idx))
+        with __worker_pool__(min(MAX_PROCESSES, len(pending))) as process_pool:
+            running: dict[Future, CaseJob] = {}
 
-    candidates = run_motion_decipher(
-        join(videos_path, video_filename),
-        target_sequence,
-        presses,
-        VIEWING_ANGLE
-    )
+            while len(pending) > 0 or len(running) > 0:
+                while len(pending) > 0 and len(running) < MAX_PROCESSES:
+                    job = pending.popleft()
+                    running[process_pool.submit(handle_proc, *job)] = job
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                if any(future.exception() is not None for future in done):
+                    break
+
+                for future in done:
+                    running.pop(future)
+                    yield future.result()
+
+            for future, job in running.items():
+                if future.done() and future.exception() is None:
+                    yield future.result()
+                else:
+                    suspects.append(job)
+
+        if len(suspects) > 0:
+            logger.log_warning(
+                f"Worker Process Died, Retrying {len(suspects)} Cases One At A Time..."
+            )
+
+def __report_batch__(
+    records: Iterable[MetricsRecord],
+    num_cases: int,
+    run_manifest: RunManifest,
+    video_paths: dict[str, str],
+    case_inputs: dict[str, str],
+    results_store: ResultsStore | None
+):
+    metrics_file: TextIO | None = None
+    if METRICS_FILE is not None and metrics.is_enabled():
+        metrics_file = open(METRICS_FILE, "w")
+
+    finished: list[MetricsRecord] = []
+    for record in records:
+        spool_path = record.pop("spool_path", None)
+        finished.append(record)
+
+        if record["status"] != "skipped":
+            run_manifest.record(
+                record["pin"],
+                video_paths[record["pin"]],
+                record["video_digest"],
+                case_inputs[record["pin"]],
+                record["status"],
+                record["output"],
+                record["error"]
+            )
+
+        if results_store is None:
+            if len(finished) % RESULTS_BATCH_SIZE == 0:
+                run_manifest.save()
+        elif record["status"] == "done" and results_store.add(
+            record["pin"],
+            VIEWING_ANGLE,
+            DELTA_T,
+            KEYPAD_LAYOUT,
+            record["num_candidates"],
+            record["success"],
+            record["rank"],
+            { "elapsed": record["elapsed"], **record.get("timers", {}) },
+            spool_path,
+            record["candidate_length"]
+        ):
+            run_manifest.save()
+
+        if metrics_file is not None:
+            metrics_file.write(dumps({ "type": "case", **record }) + "\n")
+            metrics_file.flush()
+
+        num_successes = sum(1 for record in finished if record["success"])
+        num_errors = sum(1 for record in finished if record["status"] == "error")
+        logger.log_info(
+            f"Finished {len(finished)}/{num_cases} Cases "
+            f"({num_successes} Successful, {num_errors} Crashed)."
+        )
 
-    out_file = open(join(OUTPUT_FOLDER, target_sequence + ".txt"), "w")
-    for candidate in candidates:
-        out_file.write(candidate + "\n")
-    out_file.close()
+    summary = metrics.summarize(finished)
+
+    if metrics_file is not None:
+        metrics_file.write(dumps({ "type": "summary", **summary }) + "\n")
+        metrics_file.close()
+
+    if metrics.is_enabled():
+        stage_times = ", ".join(
+            f"{name} {seconds:.2f}s" for name, seconds in sorted(summary["timers"].items())
+        )
+        stage_counts = ", ".join(
+            f"{name} {amount}" for name, amount in sorted(summary["counters"].items())
+        )
+
+        logger.log_info(f"Batch Stage Times: {stage_times}.")
+        logger.log_info(f"Batch Counters: {stage_counts}.")
 
 def main():
+    global __pipeline
+
+    metrics.enable(METRICS_ENABLED)
+    set_table_folder(LAYOUT_TABLE_FOLDER)
+    get_transition_masks(KEYPAD_LAYOUT)
+
     videos_path: str = join(TEST_CASE_FOLDER, "videos")
     keypresses_path: str = join(TEST_CASE_FOLDER, "keypresses")
 
+    manifest = PressManifest(keypresses_path, PRESS_MANIFEST_PATH)
+    num_scanned = manifest.refresh()
+    manifest.save()
+
+    if num_scanned > 0:
+        logger.log_info(f"Indexed Keypresses For {num_scanned} Cases.")
+
     if TEST_CASE_FILE is not None:
-        handle_proc(videos_path, keypresses_path, TEST_CASE_FILE)
-        return
+        video_filenames = [TEST_CASE_FILE]
+    else:
+        video_filenames = [
+            video_filename for video_filename in listdir(videos_path)
+            if video_filename.endswith(".mp4")
+        ]
+        video_filenames.sort(
+            key=lambda video_filename : getsize(join(videos_path, video_filename)),
+            reverse=True
+        )
+
+    run_manifest = RunManifest(RUN_MANIFEST_PATH)
+    video_paths: dict[str, str] = {}
+    case_inputs: dict[str, str] = {}
+    arguments: list[CaseJob] = []
+    num_unchanged: int = 0
+
+    for video_filename in video_filenames:
+        target_sequence = video_filename.replace(".mp4", "").strip()
+
+        try:
+            presses = manifest.get_press_windows(target_sequence)
+        except FileNotFoundError as e:
+            logger.log_error(f"Skipping Case {target_sequence}, {e}")
+            continue
 
-    video_filenames = listdir(videos_path)
-    video_filenames.sort()
+        video_paths[target_sequence] = join(videos_path, video_filename)
+        case_inputs[target_sequence] = __case_inputs__(presses)
 
-    if MAX_PROCESSES <= 1:
-        for video_filename in video_filenames:
-            handle_proc(videos_path, keypresses_path, video_filename)
+        if run_manifest.is_complete(
+            target_sequence,
+            video_paths[target_sequence],
+            case_inputs[target_sequence]
+        ):
+            num_unchanged += 1
+            continue
+
+        arguments.append((
+            str(videos_path),
+            str(keypresses_path),
+            video_filename,
+            presses,
+        ))
+
+    run_manifest.save()
 
+    if num_unchanged > 0:
+        logger.log_info(
+            f"Skipping {num_unchanged} Unchanged Cases "
+            f"Recorded In {RUN_MANIFEST_PATH}."
+        )
+
+    if len(arguments) == 0:
         return
-    
-    arguments = [(
-        str(videos_path),
-        str(keypresses_path),
-        video_filename,
-    ) for video_filename in video_filenames]
 
-    process_pool = Pool(processes=min(MAX_PROCESSES, len(arguments)))
-    process_pool.starmap(handle_proc, arguments)
+    results_store: ResultsStore | None = None
+    if RESULTS_STORE_PATH is not None:
+        results_store = ResultsStore(RESULTS_STORE_PATH, RESULTS_BATCH_SIZE, RESULTS_CHUNK_SIZE)
+
+    try:
+        if MAX_PROCESSES <= 1 or len(arguments) == 1:
+            if PIPELINE_WORKERS > 0:
+                __pipeline = InferencePipeline(
+                    PIPELINE_WORKERS,
+                    estimator_options={
+                        "min_detection_confidence": MIN_DETECTION_CONFIDENCE,
+                        "roi_padding": HAND_ROI_PADDING,
+                        "inference_scale": INFERENCE_SCALE,
+                    }
+                )
+
+            __report_batch__(
+                (handle_proc(*argument) for argument in arguments),
+                len(arguments),
+                run_manifest,
+                video_paths,
+                case_inputs,
+                results_store
+            )
+
+            if __pipeline is not None:
+                __pipeline.close()
+                __pipeline = None
+        else:
+            __report_batch__(
+                __run_pool__(arguments),
+                len(arguments),
+                run_manifest,
+                video_paths,
+                case_inputs,
+                results_store
+            )
+    finally:
+        if results_store is not None:
+            results_store.flush()
+
+        run_manifest.save()
+
+        if results_store is not None:
+            if EXPORT_TEXT and not COUNT_ONLY:
+                num_exported = results_store.export_text(OUTPUT_FOLDER)
+                logger.log_info(f"Exported {num_exported} Cases To {OUTPUT_FOLDER}.")
+
+            results_store.close()
 
 
 if __name__ == "__main__":
+    logger.configure(LOG_LEVEL, LOG_JSON, LOG_FILE)
+    logger.start_listener()
+
     try:
         if not isdir(OUTPUT_FOLDER):
             mkdir(OUTPUT_FOLDER)
         main()
     except Exception as e:
-        logger.log_error(f"{e}")
\ No newline at end of file
+        logger.log_error(f"{e}")
+    finally:
+        logger.stop_listener()
\ No newline at end of file
@@ -1,72 +1,261 @@
-import cv2 as cv
-from math import sin, cos, pi
+from concurrent.futures import Executor
+from typing import Generator
 import motion_decipher.logger as logger
-from motion_decipher.math import normalize_3d
-from motion_decipher.quest_3_correlation import quest_3_correlation
-from motion_decipher.pose_estimation import Triangle, pose_estimation
+import motion_decipher.metrics as metrics
+from motion_decipher.metrics import MetricsRecord
+from motion_decipher.math import normalize_3d, project_points
+from motion_decipher.quest_3_correlation import (
+    quest_3_correlation,
+    iter_quest_3_correlation,
+    count_quest_3_correlation,
+    quest_3_correlation_contains
+)
+from motion_decipher.layouts import (
+    KeypadLayout,
+    register_layout,
+    get_layout,
+    get_layout_names,
+    get_transition_masks,
+    set_table_folder
+)
+from motion_decipher.frame_source import Frame, FrameSource, VideoFrameSource, ImageSequenceFrameSource
+from motion_decipher.pose_estimation import Triangle, HandPoseEstimator, pose_estimation
+from motion_decipher.pipeline import InferencePipeline, FrameCallback
+from motion_decipher.landmark_cache import LandmarkCache, file_digest
+from motion_decipher.run_manifest import RunManifest, inputs_digest
+from motion_decipher.results_store import (
+    ResultsStore,
+    CandidateSpool,
+    pack_candidate,
+    pack_candidates,
+    unpack_candidates
+)
+from motion_decipher.keypresses import read_press_windows, PressManifest
+from motion_decipher.parameter_sweep import SweepCase, sweep_parameters, write_sweep_table
 
-def run_motion_decipher(
+def __estimate_presses__(
+    frame_source: FrameSource,
+    presses: list[tuple[int, int]],
+    estimator: HandPoseEstimator,
+    on_frame: FrameCallback | None = None
+) -> list[Triangle | None]:
+    press_triangles: list[Triangle | None] = []
+    estimator.reset()
+
+    for press_idx, (min_idx, max_idx) in enumerate(presses):
+        press_triangle: Triangle | None = None
+        estimator.reset_tracking()
+
+        for frame_idx, frame in frame_source.window(min_idx, max_idx):
+            landmarks = next(estimator.estimate_landmarks([frame]))
+
+            if on_frame is not None:
+                on_frame(press_idx, frame_idx, landmarks)
+
+            if landmarks is not None:
+                press_triangle = estimator.to_triangle(landmarks)
+                break
+
+        press_triangles.append(press_triangle)
+
+    return press_triangles
+
+def extract_triangles(
     video_path: str,
-    target_sequence: str,
     presses: list[tuple[int, int]],
-    view_angle: float
-) -> list[str]:
-    logger.log_info(f"Starting Case {target_sequence}.")
+    estimator: HandPoseEstimator | None = None,
+    pipeline: InferencePipeline | None = None,
+    cache: LandmarkCache | None = None,
+    frame_source: FrameSource | None = None
+) -> list[Triangle]:
+    owns_estimator: bool = estimator is None and pipeline is None
+    if owns_estimator:
+        estimator = HandPoseEstimator()
 
-    if len(presses) == 0:
-        logger.log_warning("No Press Events Provided...")
-        return []
-    
-    press_idx: int = 0
-    frame_idx: int = 0
-    triangles: list[Triangle] = []
-    video_capture = cv.VideoCapture(video_path)
-
-    while video_capture.isOpened():
-        has_data, frame = video_capture.read()
-        if not has_data:
-            break
-
-        if frame_idx >= presses[press_idx][0]:
-            if frame_idx <= presses[press_idx][1]:
-                frame_triangles = pose_estimation([
-                    cv.cvtColor(frame, cv.COLOR_BGR2RGB)
-                ])
-
-                if len(frame_triangles) > 0:
-                    triangles.append(frame_triangles[0])
-                    press_idx += 1
-
-                    if press_idx >= len(presses):
-                        break
-            else:
-                press_idx += 1
-
-                if press_idx >= len(presses):
+    model: HandPoseEstimator | InferencePipeline = estimator if pipeline is None else pipeline
+
+    press_triangles: list[Triangle | None] = [None] * len(presses)
+    pending: list[tuple[int, tuple[int, int]]] = []
+    on_frame: FrameCallback | None = None
+
+    if cache is None:
+        pending = list(enumerate(presses))
+    else:
+        video_hash = cache.video_hash(video_path)
+        settings = LandmarkCache.settings_key(
+            model.get_settings() if frame_source is None
+            else { **model.get_settings(), **frame_source.get_settings() }
+        )
+
+        for press_idx, (min_idx, max_idx) in enumerate(presses):
+            cached = cache.lookup(video_hash, settings, min_idx, max_idx)
+
+            frame_idx = min_idx
+            while frame_idx <= max_idx and frame_idx in cached:
+                if cached[frame_idx] is not None:
+                    press_triangles[press_idx] = model.to_triangle(cached[frame_idx])
                     break
 
-        frame_idx += 1
+                frame_idx += 1
 
-    video_capture.release()
+            if press_triangles[press_idx] is None and frame_idx <= max_idx:
+                pending.append((press_idx, (frame_idx, max_idx)))
 
-    logger.log_info("Finished Extracting Video Information.")
+        on_frame = lambda _, frame_idx, landmarks : cache.store(
+            video_hash, settings, frame_idx, landmarks
+        )
+
+    if len(pending) > 0:
+        windows: list[tuple[int, int]] = [window for _, window in pending]
+
+        owns_frame_source: bool = frame_source is None
+        if owns_frame_source:
+            frame_source = VideoFrameSource(video_path)
+
+        if pipeline is not None:
+            window_triangles = pipeline.extract(frame_source, windows, on_frame)
+        else:
+            window_triangles = __estimate_presses__(
+                frame_source, windows, estimator, on_frame
+            )
+
+        if owns_frame_source:
+            frame_source.close()
+
+        for (press_idx, _), triangle in zip(pending, window_triangles):
+            press_triangles[press_idx] = triangle
 
-    points_3d: list[tuple[float, float, float]] = normalize_3d([
+    if cache is not None:
+        cache.commit()
+
+    if owns_estimator:
+        estimator.close()
+
+    return [triangle for triangle in press_triangles if triangle is not None]
+
+def triangles_to_points(triangles: list[Triangle]) -> list[tuple[float, float, float]]:
+    return normalize_3d([
         (t.get_x(), t.get_y(), t.get_area())
         for t in triangles
     ])
 
-    view_radians: float = view_angle * pi / 180.0
-    points_2d: list[tuple[float, float]] = [
-        (
-            (1.0 - x) * cos(view_radians) + (1.0 - z) * sin(view_radians),
-            1.0 - y
-        ) for x, y, z in points_3d
-    ]
+def reconstruct_motion(
+    video_path: str,
+    target_sequence: str,
+    presses: list[tuple[int, int]],
+    view_angle: float,
+    estimator: HandPoseEstimator | None = None,
+    pipeline: InferencePipeline | None = None,
+    cache: LandmarkCache | None = None,
+    frame_source: FrameSource | None = None
+) -> list[tuple[float, float]]:
+    logger.log_info(f"Starting Case {target_sequence}.")
+
+    if len(presses) == 0:
+        logger.log_warning("No Press Events Provided...")
+        return []
+
+    with metrics.timer("extraction"):
+        triangles: list[Triangle] = extract_triangles(
+            video_path,
+            presses,
+            estimator,
+            pipeline,
+            cache,
+            frame_source
+        )
+
+    metrics.count("presses", len(presses))
+    metrics.count("triangles", len(triangles))
+    logger.log_info("Finished Extracting Video Information.")
+
+    with metrics.timer("reconstruction"):
+        points_2d: list[tuple[float, float]] = project_points(
+            triangles_to_points(triangles),
+            view_angle
+        )
 
     logger.log_info("Finished Keyboard Reconstruction.")
+    return points_2d
 
-    results = quest_3_correlation(points_2d)
+def iter_motion_decipher(
+    video_path: str,
+    target_sequence: str,
+    presses: list[tuple[int, int]],
+    view_angle: float,
+    estimator: HandPoseEstimator | None = None,
+    pipeline: InferencePipeline | None = None,
+    cache: LandmarkCache | None = None,
+    delta_t: float = 14.5,
+    max_candidates: int | None = None,
+    stop_at_target: bool = False,
+    layout: KeypadLayout | str = "quest_3",
+    frame_source: FrameSource | None = None
+) -> Generator[str, None, None]:
+    points_2d = reconstruct_motion(
+        video_path,
+        target_sequence,
+        presses,
+        view_angle,
+        estimator,
+        pipeline,
+        cache,
+        frame_source
+    )
+
+    candidates = iter_quest_3_correlation(
+        points_2d,
+        delta_t,
+        max_candidates,
+        target_sequence if stop_at_target else None,
+        layout
+    )
+
+    if not metrics.is_enabled():
+        yield from candidates
+        return
+
+    while True:
+        with metrics.timer("correlation"):
+            candidate = next(candidates, None)
+
+        if candidate is None:
+            return
+
+        metrics.count("candidates")
+        yield candidate
+
+def run_motion_decipher(
+    video_path: str,
+    target_sequence: str,
+    presses: list[tuple[int, int]],
+    view_angle: float,
+    estimator: HandPoseEstimator | None = None,
+    pipeline: InferencePipeline | None = None,
+    cache: LandmarkCache | None = None,
+    delta_t: float = 14.5,
+    layout: KeypadLayout | str = "quest_3",
+    frame_source: FrameSource | None = None,
+    executor: Executor | None = None
+) -> list[str]:
+    points_2d = reconstruct_motion(
+        video_path,
+        target_sequence,
+        presses,
+        view_angle,
+        estimator,
+        pipeline,
+        cache,
+        frame_source
+    )
+
+    if len(presses) == 0:
+        return []
+
+    with metrics.timer("correlation"):
+        results = quest_3_correlation(points_2d, delta_t, layout, executor)
+
+    metrics.count("candidates", len(results))
 
     if not target_sequence in results:
         logger.log_error(f"Failure Case {target_sequence}...")
@@ -75,3 +264,38 @@ def run_motion_decipher(
     logger.log_success(f"Success Case {target_sequence}!")
     return results
 
+def evaluate_motion_decipher(
+    video_path: str,
+    target_sequence: str,
+    presses: list[tuple[int, int]],
+    view_angle: float,
+    estimator: HandPoseEstimator | None = None,
+    pipeline: InferencePipeline | None = None,
+    cache: LandmarkCache | None = None,
+    delta_t: float = 14.5,
+    layout: KeypadLayout | str = "quest_3",
+    frame_source: FrameSource | None = None
+) -> tuple[int, bool]:
+    points_2d = reconstruct_motion(
+        video_path,
+        target_sequence,
+        presses,
+        view_angle,
+        estimator,
+        pipeline,
+        cache,
+        frame_source
+    )
+
+    with metrics.timer("correlation"):
+        num_candidates = count_quest_3_correlation(points_2d, delta_t, layout)
+        is_success = quest_3_correlation_contains(points_2d, target_sequence, delta_t, layout)
+
+    metrics.count("candidates", num_candidates)
+
+    if not is_success:
+        logger.log_error(f"Failure Case {target_sequence} ({num_candidates} Candidates)...")
+    else:
+        logger.log_success(f"Success Case {target_sequence} ({num_candidates} Candidates)!")
+
+    return num_candidates, is_success
@@ -0,0 +1,212 @@
+import numpy as np
+import motion_decipher.metrics as metrics
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import scandir
+from os.path import join
+from typing import Generator, Protocol
+
+
+Frame = np.ndarray
+
+class FrameSource(Protocol):
+    def get_settings(self) -> dict[str, object]:
+        ...
+
+    def is_opened(self) -> bool:
+        ...
+
+    def close(self):
+        ...
+
+    def window(self, min_idx: int, max_idx: int) -> Generator[tuple[int, Frame], None, None]:
+        ...
+
+class VideoFrameSource:
+    __video_path: str
+    __video_capture: object
+    __position: int
+    __seek_threshold: int
+
+    def __init__(self, video_path: str, seek_threshold: int = 120):
+        self.__video_path = video_path
+        self.__seek_threshold = seek_threshold
+        self.__open__()
+
+    def __enter__(self) -> "VideoFrameSource":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __open__(self):
+        import cv2 as cv
+
+        self.__video_capture = cv.VideoCapture(self.__video_path)
+        self.__position = 0
+
+    def __seek__(self, frame_idx: int):
+        import cv2 as cv
+
+        if frame_idx == self.__position:
+            return
+
+        if (
+            frame_idx < self.__position or
+            frame_idx - self.__position > self.__seek_threshold
+        ):
+            has_seeked = self.__video_capture.set(cv.CAP_PROP_POS_FRAMES, frame_idx)
+            if (
+                has_seeked and
+                int(self.__video_capture.get(cv.CAP_PROP_POS_FRAMES)) == frame_idx
+            ):
+                self.__position = frame_idx
+                return
+
+            if has_seeked or frame_idx < self.__position:
+                self.__video_capture.release()
+                self.__open__()
+
+        while self.__position < frame_idx:
+            if not self.__video_capture.grab():
+                return
+
+            self.__position += 1
+
+    def get_settings(self) -> dict[str, object]:
+        return {}
+
+    def is_opened(self) -> bool:
+        return self.__video_capture.isOpened()
+
+    def close(self):
+        self.__video_capture.release()
+
+    def window(self, min_idx: int, max_idx: int) -> Generator[tuple[int, Frame], None, None]:
+        import cv2 as cv
+
+        if not self.__video_capture.isOpened():
+            return
+
+        with metrics.timer("seek"):
+            self.__seek__(min_idx)
+
+        if self.__position != min_idx:
+            return
+
+        for frame_idx in range(min_idx, max_idx + 1):
+            with metrics.timer("decode"):
+                has_data, frame = self.__video_capture.read()
+
+            if not has_data:
+                return
+
+            self.__position += 1
+            metrics.count("frames_decoded")
+
+            with metrics.timer("convert"):
+                frame = cv.cvtColor(frame, cv.COLOR_BGR2RGB)
+
+            yield frame_idx, frame
+
+
+class ImageSequenceFrameSource:
+    __frame_paths: dict[int, str]
+    __reduction: int
+    __read_flag: int
+    __prefetch: int
+    __executor: ThreadPoolExecutor | None
+
+    __READ_FLAGS: dict[int, str] = {
+        1: "IMREAD_COLOR",
+        2: "IMREAD_REDUCED_COLOR_2",
+        4: "IMREAD_REDUCED_COLOR_4",
+        8: "IMREAD_REDUCED_COLOR_8",
+    }
+
+    def __init__(self, frames_path: str, reduction: int = 1, max_workers: int = 4):
+        import cv2 as cv
+
+        if reduction not in self.__READ_FLAGS:
+            raise ValueError(f"Unsupported frame reduction {reduction}, expected 1, 2, 4 or 8.")
+
+        self.__frame_paths = {}
+        self.__reduction = reduction
+        self.__read_flag = getattr(cv, self.__READ_FLAGS[reduction])
+        self.__prefetch = max(1, max_workers)
+        self.__executor = ThreadPoolExecutor(max_workers=self.__prefetch)
+
+        with scandir(frames_path) as press_entries:
+            press_paths = [entry.path for entry in press_entries if entry.is_dir()]
+
+        for press_path in press_paths:
+            with scandir(press_path) as frame_entries:
+                for entry in frame_entries:
+                    if not entry.name.endswith(".jpg"):
+                        continue
+
+                    frame_idx = int(entry.name.replace(".jpg", "").strip())
+                    self.__frame_paths[frame_idx] = join(press_path, entry.name)
+
+    def __enter__(self) -> "ImageSequenceFrameSource":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __read__(self, frame_path: str) -> Frame | None:
+        import cv2 as cv
+
+        frame = cv.imread(frame_path, self.__read_flag)
+        if frame is None:
+            return None
+
+        return cv.cvtColor(frame, cv.COLOR_BGR2RGB)
+
+    def get_settings(self) -> dict[str, object]:
+        return {
+            "frame_source": "images",
+            "reduction": self.__reduction,
+        }
+
+    def get_frame_indices(self) -> list[int]:
+        return sorted(self.__frame_paths.keys())
+
+    def is_opened(self) -> bool:
+        return self.__executor is not None
+
+    def close(self):
+        if self.__executor is not None:
+            self.__executor.shutdown(cancel_futures=True)
+            self.__executor = None
+
+    def window(self, min_idx: int, max_idx: int) -> Generator[tuple[int, Frame], None, None]:
+        if self.__executor is None:
+            return
+
+        frame_indices = [
+            frame_idx for frame_idx in range(min_idx, max_idx + 1)
+            if frame_idx in self.__frame_paths
+        ]
+        pending: deque[tuple[int, Future]] = deque()
+
+        try:
+            for frame_idx in frame_indices:
+                pending.append((
+                    frame_idx,
+                    self.__executor.submit(self.__read__, self.__frame_paths[frame_idx])
+                ))
+
+                while len(pending) >= self.__prefetch or (
+                    frame_idx == frame_indices[-1] and len(pending) > 0
+                ):
+                    ready_idx, future = pending.popleft()
+                    with metrics.timer("decode"):
+                        frame = future.result()
+
+                    if frame is not None:
+                        metrics.count("frames_decoded")
+                        yield ready_idx, frame
+        finally:
+            for _, future in pending:
+                future.cancel()
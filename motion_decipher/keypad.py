@@ -1,5 +1,6 @@
+import numpy as np
 from math import atan2, pi
-from typing import Callable
+from typing import Generator
 
 
 class Direction:
@@ -94,23 +95,24 @@ class Direction:
         return [Direction.EAST]
 
 class Key:
+    __slots__ = ("__id", "__x", "__y", "__character")
+
     __id: int
     __x: float
     __y: float
-
-    __press_callback__: Callable[[str, int | None], str]
+    __character: str
 
     def __init__(
         self,
         key_id: int,
         x: float,
         y: float,
-        press_callback: Callable[[str, int | None], str],
+        character: str,
     ):
         self.__id = key_id
         self.__x = x
         self.__y = y
-        self.__press_callback = press_callback
+        self.__character = character
 
     def get_id(self) -> int:
         return self.__id
@@ -118,41 +120,48 @@ class Key:
     def get_center(self) -> tuple[float, float]:
         return self.__x, self.__y
 
+    def get_character(self) -> str:
+        return self.__character
+
     def press(
         self,
         current_str: str,
         last_key_id: int | None = None
     ) -> tuple[str, int]:
-        return self.__press_callback(current_str, last_key_id), self.__id
+        return current_str + self.__character, self.__id
 
 class Keypad:
-    __key_list: list[Key]
-    __angle_map: dict[int, dict[int, list[int]]]
-    __distance_map: list[list[tuple[float, float]]]
+    __slots__ = (
+        "__key_list",
+        "__characters",
+        "__centers",
+        "__angle_map",
+        "__distance_map",
+    )
+
+    __key_list: tuple[Key, ...]
+    __characters: tuple[str, ...]
+    __centers: np.ndarray
+    __angle_map: np.ndarray
+    __distance_map: np.ndarray
+
+    __SCALE_BATCH: int = 16
 
     def __init__(self, keys: list[Key]):
-        self.__key_list = keys
+        self.__key_list = tuple(keys)
+        self.__characters = tuple(key.get_character() for key in keys)
+        self.__centers = np.array([key.get_center() for key in keys], dtype=np.float64).reshape(-1, 2)
         self.__build_angle_map__()
         self.__build_distance_map__()
 
     def __build_angle_map__(self):
-        self.__angle_map = {}
+        num_keys = len(self.__key_list)
+        self.__angle_map = np.zeros((num_keys, 8, num_keys), dtype=bool)
 
-        for idx in range(len(self.__key_list)):
+        for idx in range(num_keys):
             key_1 = self.__key_list[idx].get_center()
 
-            self.__angle_map[idx] = {
-                Direction.NORTH: [],
-                Direction.NORTH_EAST: [],
-                Direction.EAST: [],
-                Direction.SOUTH_EAST: [],
-                Direction.SOUTH: [],
-                Direction.SOUTH_WEST: [],
-                Direction.WEST: [],
-                Direction.NORTH_WEST: [],
-            }
-
-            for jdx in range(len(self.__key_list)):
+            for jdx in range(num_keys):
                 if idx == jdx:
                     continue
 
@@ -162,40 +171,17 @@ class Keypad:
                     key_2,
                     0.0
                 ):
-                    self.__angle_map[idx][direction].append(jdx)
+                    self.__angle_map[idx, direction, jdx] = True
 
     def __build_distance_map__(self):
-        num_keys = len(self.__key_list)
-        self.__distance_map = [[(0.0, 0.0)] * num_keys for _ in range(num_keys)]
-
-        for idx in range(num_keys):
-            key_1 = self.__key_list[idx].get_center()
-            self.__distance_map[idx][idx] = (0.0, 0.0)
-
-            for jdx in range(idx + 1, num_keys):
-                key_2 = self.__key_list[jdx].get_center()
-
-                distance = (
-                    abs(key_1[0] - key_2[0]),
-                    abs(key_1[1] - key_2[1])
-                )
-
-                self.__distance_map[idx][jdx] = distance
-                self.__distance_map[jdx][idx] = distance
+        self.__distance_map = np.abs(
+            self.__centers[:, np.newaxis, :] - self.__centers[np.newaxis, :, :]
+        )
 
-    def infer_candidates(
-        self,
-        input_points: list[tuple[float, float]],
-        angle_ambiguous_region: float,
-        distance_ambiguous_region: tuple[float, float]
-    ) -> list[str]:
-        if len(input_points) == 0:
-            return []
-        elif len(input_points) == 1:
-            return [key.press("")[0] for key in self.__key_list]
-
-        candidates: set[str] = set()
+    def get_keys(self) -> tuple[Key, ...]:
+        return self.__key_list
 
+    def __scale_pairs__(self, input_points: list[tuple[float, float]]) -> np.ndarray:
         max_point_1 = (0.0, 0.0)
         max_point_2 = (0.0, 0.0)
         max_dist: float = 0.0
@@ -214,86 +200,227 @@ class Keypad:
                     max_point_1 = point_1
                     max_point_2 = point_2
 
-        for kdx_1 in range(len(self.__key_list)):
-            key_1 = self.__key_list[kdx_1].get_center()
-            for kdx_2 in range(len(self.__key_list)):
-                key_2 = self.__key_list[kdx_2].get_center()
+        key_deltas = self.__centers[:, np.newaxis, :] - self.__centers[np.newaxis, :, :]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scales = key_deltas / np.array([
+                max_point_1[0] - max_point_2[0],
+                max_point_1[1] - max_point_2[1]
+            ], dtype=np.float64)
 
-                s_x = (key_1[0] - key_2[0]) / (max_point_1[0] - max_point_2[0])
-                s_y = (key_1[1] - key_2[1]) / (max_point_1[1] - max_point_2[1])
+        scales = scales.reshape(-1, 2) + 0.0
+        is_valid = np.isfinite(scales).all(axis=1) & (scales >= 0.0).all(axis=1)
 
-                if s_x < 0.0 or s_y < 0.0:
+        return np.unique(scales[is_valid], axis=0)
+
+    def __expand_sequences__(
+        self,
+        input_points: list[tuple[float, float]],
+        scales: np.ndarray,
+        angle_ambiguous_region: float,
+        distance_ambiguous_region: tuple[float, float],
+        beam_width: int | None = None,
+        error_budget: float | None = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        num_keys = len(self.__key_list)
+        num_scales = len(scales)
+
+        first_keys = np.tile(np.arange(num_keys), num_scales)
+        scale_idx = np.repeat(np.arange(num_scales), num_keys)
+        errors = np.zeros(len(first_keys), dtype=np.float64)
+        keys = first_keys
+
+        layers: list[tuple[np.ndarray, np.ndarray]] = []
+        stay_mask = np.eye(num_keys, dtype=bool)
+
+        last_point = input_points[0]
+        for cur_point in input_points[1:]:
+            dx = scales[:, 0] * abs(cur_point[0] - last_point[0])
+            dy = scales[:, 1] * abs(cur_point[1] - last_point[1])
+
+            direction_mask = np.zeros((num_scales, 8), dtype=bool)
+            for cur_scale, (s_x, s_y) in enumerate(scales.tolist()):
+                direction_mask[cur_scale, Direction.points_to_direction(
+                    (last_point[0] * s_x, last_point[1] * s_y),
+                    (cur_point[0] * s_x, cur_point[1] * s_y),
+                    angle_ambiguous_region
+                )] = True
+
+            is_reachable = stay_mask[keys] | (
+                direction_mask[scale_idx][:, :, np.newaxis] &
+                self.__angle_map[keys]
+            ).any(axis=1)
+
+            err_x = np.abs(dx[scale_idx][:, np.newaxis] - self.__distance_map[keys, :, 0])
+            err_y = np.abs(dy[scale_idx][:, np.newaxis] - self.__distance_map[keys, :, 1])
+
+            new_errors = errors[:, np.newaxis] + err_x + err_y
+            is_reachable &= (
+                (err_x <= distance_ambiguous_region[0]) &
+                (err_y <= distance_ambiguous_region[1])
+            )
+
+            if error_budget is not None:
+                is_reachable &= new_errors <= error_budget
+
+            parents, keys = np.nonzero(is_reachable)
+            errors = new_errors[parents, keys]
+            scale_idx = scale_idx[parents]
+
+            if beam_width is not None and len(keys) > beam_width:
+                order = np.lexsort((errors, scale_idx))
+                sorted_scales = scale_idx[order]
+                group_rank = np.arange(len(order)) - np.searchsorted(sorted_scales, sorted_scales)
+                kept = np.sort(order[group_rank < beam_width])
+
+                parents = parents[kept]
+                keys = keys[kept]
+                errors = errors[kept]
+                scale_idx = scale_idx[kept]
+
+            layers.append((parents, keys))
+            last_point = cur_point
+
+        sequences = np.empty((len(keys), len(input_points)), dtype=np.int64)
+        node_idx = np.arange(len(keys))
+
+        for step_idx in range(len(layers) - 1, -1, -1):
+            parents, keys = layers[step_idx]
+            sequences[:, step_idx + 1] = keys[node_idx]
+            node_idx = parents[node_idx]
+
+        sequences[:, 0] = first_keys[node_idx]
+        return sequences, errors, scale_idx
+
+    def __scored_batches__(
+        self,
+        input_points: list[tuple[float, float]],
+        angle_ambiguous_region: float,
+        distance_ambiguous_region: tuple[float, float],
+        beam_width: int | None = None,
+        error_budget: float | None = None
+    ) -> Generator[list[tuple[int, float, str]], None, None]:
+        scales = self.__scale_pairs__(input_points)
+        flat_axes = (scales == 0.0).sum(axis=1)
+
+        for batch_start in range(0, len(scales), self.__SCALE_BATCH):
+            sequences, errors, scale_idx = self.__expand_sequences__(
+                input_points,
+                scales[batch_start:batch_start + self.__SCALE_BATCH],
+                angle_ambiguous_region,
+                distance_ambiguous_region,
+                beam_width,
+                error_budget
+            )
+
+            penalties = flat_axes[batch_start + scale_idx]
+            order = np.lexsort((errors, penalties))
+
+            unique_sequences, first_idx = np.unique(sequences[order], axis=0, return_index=True)
+            first_idx = order[first_idx]
+
+            yield [
+                (cur_penalty, cur_err, self.__press_sequence__(sequence))
+                for cur_penalty, cur_err, sequence in zip(
+                    penalties[first_idx].tolist(),
+                    errors[first_idx].tolist(),
+                    unique_sequences.tolist()
+                )
+            ]
+
+    def __press_sequence__(self, sequence: list[int]) -> str:
+        return "".join([self.__characters[key_idx] for key_idx in sequence])
+
+    def infer_candidates(
+        self,
+        input_points: list[tuple[float, float]],
+        angle_ambiguous_region: float,
+        distance_ambiguous_region: tuple[float, float],
+        beam_width: int | None = None,
+        error_budget: float | None = None
+    ) -> list[str]:
+        if len(input_points) == 0:
+            return []
+        elif len(input_points) == 1:
+            return list(self.__characters)
+
+        candidate_errors: dict[str, tuple[int, float]] = {}
+
+        for scored_candidates in self.__scored_batches__(
+            input_points,
+            angle_ambiguous_region,
+            distance_ambiguous_region,
+            beam_width,
+            error_budget
+        ):
+            for cur_penalty, cur_err, candidate in scored_candidates:
+                cur_score = (cur_penalty, cur_err)
+                if candidate not in candidate_errors or cur_score < candidate_errors[candidate]:
+                    candidate_errors[candidate] = cur_score
+
+        return sorted(
+            candidate_errors,
+            key=lambda candidate : (candidate_errors[candidate], candidate)
+        )
+
+    def iter_candidates(
+        self,
+        input_points: list[tuple[float, float]],
+        angle_ambiguous_region: float,
+        distance_ambiguous_region: tuple[float, float],
+        max_candidates: int | None = None,
+        target: str | None = None,
+        beam_width: int | None = None,
+        error_budget: float | None = None
+    ) -> Generator[str, None, None]:
+        if max_candidates is not None and max_candidates <= 0:
+            return
+
+        candidates: set[str] = set()
+
+        if len(input_points) == 0:
+            return
+        elif len(input_points) == 1:
+            for candidate in self.__characters:
+                if candidate in candidates:
                     continue
 
-                last_point = input_points[0]
-                cur_sequences = [(0.0, [idx]) for idx in range(len(self.__key_list))]
-                for cur_point in input_points[1:]:
-                    new_sequences = []
-
-                    dx = s_x * abs(cur_point[0] - last_point[0])
-                    dy = s_y * abs(cur_point[1] - last_point[1])
-                    cur_directions = Direction.points_to_direction(
-                        (last_point[0] * s_x, last_point[1] * s_y),
-                        (cur_point[0] * s_x, cur_point[1] * s_y),
-                        angle_ambiguous_region
-                    )
-
-                    for cur_err, sequence in cur_sequences:
-                        last_key_idx = sequence[-1]
-
-                        err_x = abs(dx - self.__distance_map[last_key_idx][last_key_idx][0])
-                        err_y = abs(dy - self.__distance_map[last_key_idx][last_key_idx][1])
-
-                        if (
-                            err_x <= distance_ambiguous_region[0] and
-                            err_y <= distance_ambiguous_region[1]
-                        ):
-                            new_sequences.append((
-                                cur_err + err_x + err_y,
-                                sequence + [last_key_idx]
-                            ))
-
-                        for direction in cur_directions:
-                            for key_idx in self.__angle_map[last_key_idx][direction]:
-                                err_x = abs(dx - self.__distance_map[last_key_idx][key_idx][0])
-                                err_y = abs(dy - self.__distance_map[last_key_idx][key_idx][1])
-
-                                if (
-                                    err_x <= distance_ambiguous_region[0] and
-                                    err_y <= distance_ambiguous_region[1]
-                                ):
-                                    new_sequences.append((
-                                        cur_err + err_x + err_y,
-                                        sequence + [key_idx]
-                                    ))
-
-                    cur_sequences = new_sequences
-                    last_point = cur_point
-
-                for cur_err, sequence in cur_sequences:
-                    last_key_id = None
-                    candidate: str = ""
-                    for key_idx in sequence:
-                        candidate, last_key_id = self.__key_list[key_idx].press(
-                            candidate, last_key_id
-                        )
-
-                    candidates.add(candidate)
-
-        return list(candidates)
+                candidates.add(candidate)
+                yield candidate
+
+                if candidate == target or len(candidates) == max_candidates:
+                    return
+            return
+
+        for scored_candidates in self.__scored_batches__(
+            input_points,
+            angle_ambiguous_region,
+            distance_ambiguous_region,
+            beam_width,
+            error_budget
+        ):
+            for _, _, candidate in sorted(scored_candidates):
+                if candidate in candidates:
+                    continue
+
+                candidates.add(candidate)
+                yield candidate
+
+                if candidate == target or len(candidates) == max_candidates:
+                    return
 
 META_QUEST_3_KEYPAD = Keypad([
-    Key(0, 0.5, 0.0, lambda x, _ : x + '0'),
+    Key(0, 0.5, 0.0, '0'),
 
-    Key(1, 0.0, 1.0, lambda x, _ : x + '1'),
-    Key(2, 0.5, 1.0, lambda x, _ : x + '2'),
-    Key(3, 1.0, 1.0, lambda x, _ : x + '3'),
+    Key(1, 0.0, 1.0, '1'),
+    Key(2, 0.5, 1.0, '2'),
+    Key(3, 1.0, 1.0, '3'),
 
-    Key(4, 0.0, 2/3, lambda x, _ : x + '4'),
-    Key(5, 0.5, 2/3, lambda x, _ : x + '5'),
-    Key(6, 1.0, 2/3, lambda x, _ : x + '6'),
+    Key(4, 0.0, 2/3, '4'),
+    Key(5, 0.5, 2/3, '5'),
+    Key(6, 1.0, 2/3, '6'),
 
-    Key(7, 0.0, 1/3, lambda x, _ : x + '7'),
-    Key(8, 0.5, 1/3, lambda x, _ : x + '8'),
-    Key(9, 1.0, 1/3, lambda x, _ : x + '9'),
+    Key(7, 0.0, 1/3, '7'),
+    Key(8, 0.5, 1/3, '8'),
+    Key(9, 1.0, 1/3, '9'),
 ])
\ No newline at end of file
@@ -0,0 +1,173 @@
+from json import dump, load
+from os import replace, scandir, stat
+from os.path import join, abspath, dirname, isfile
+from tempfile import NamedTemporaryFile
+
+
+PressWindows = dict[int, tuple[int, int] | None]
+
+def __scan_press_folder__(press_path: str) -> tuple[int, int] | None:
+    min_idx = 999_999_999
+    max_idx = -999_999_999
+
+    with scandir(press_path) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".jpg"):
+                continue
+
+            img_idx = int(entry.name.replace(".jpg", "").strip())
+            min_idx = min(min_idx, img_idx)
+            max_idx = max(max_idx, img_idx)
+
+    if min_idx > max_idx:
+        return None
+
+    return min_idx, max_idx
+
+def read_press_windows(
+    keypresses_path: str,
+    target_sequence: str
+) -> list[tuple[int, int]]:
+    video_keypresses_path: str = join(keypresses_path, target_sequence)
+
+    presses: list[tuple[int, int]] = []
+    for idx in range(1, len(target_sequence) + 1):
+        press_window = __scan_press_folder__(join(video_keypresses_path, str(idx)))
+
+        if press_window is not None:
+            presses.append(press_window)
+
+    return presses
+
+class PressManifest:
+    __keypresses_path: str
+    __manifest_path: str | None
+    __signatures: dict[str, list[int]]
+    __cases: dict[str, PressWindows]
+    __is_dirty: bool
+
+    __MANIFEST_VERSION: int = 1
+
+    def __init__(self, keypresses_path: str, manifest_path: str | None = None):
+        self.__keypresses_path = abspath(keypresses_path)
+        self.__manifest_path = manifest_path
+        self.__signatures = {}
+        self.__cases = {}
+        self.__is_dirty = False
+
+        if manifest_path is not None and isfile(manifest_path):
+            self.__load__()
+
+    def __load__(self):
+        with open(self.__manifest_path, "r") as manifest_file:
+            manifest = load(manifest_file)
+
+        if (
+            manifest.get("version") != self.__MANIFEST_VERSION or
+            manifest.get("keypresses_path") != self.__keypresses_path
+        ):
+            return
+
+        for target_sequence, case in manifest["cases"].items():
+            self.__signatures[target_sequence] = case["signature"]
+            self.__cases[target_sequence] = {
+                int(idx): None if window is None else (window[0], window[1])
+                for idx, window in case["presses"].items()
+            }
+
+    def __case_signature__(self, case_path: str) -> tuple[list[int], list[str]]:
+        signature: list[int] = [stat(case_path).st_mtime_ns]
+        press_names: list[str] = []
+
+        with scandir(case_path) as entries:
+            press_entries = sorted(
+                (entry for entry in entries if entry.is_dir() and entry.name.isdigit()),
+                key=lambda entry : int(entry.name)
+            )
+
+        for entry in press_entries:
+            signature.append(int(entry.name))
+            signature.append(entry.stat().st_mtime_ns)
+            press_names.append(entry.name)
+
+        return signature, press_names
+
+    def refresh(self) -> int:
+        num_scanned: int = 0
+        target_sequences: set[str] = set()
+
+        with scandir(self.__keypresses_path) as entries:
+            case_entries = [entry for entry in entries if entry.is_dir()]
+
+        for entry in case_entries:
+            target_sequences.add(entry.name)
+            signature, press_names = self.__case_signature__(entry.path)
+
+            if self.__signatures.get(entry.name) == signature:
+                continue
+
+            self.__signatures[entry.name] = signature
+            self.__cases[entry.name] = {
+                int(press_name): __scan_press_folder__(join(entry.path, press_name))
+                for press_name in press_names
+            }
+            self.__is_dirty = True
+            num_scanned += 1
+
+        for target_sequence in list(self.__cases.keys()):
+            if target_sequence not in target_sequences:
+                del self.__cases[target_sequence]
+                del self.__signatures[target_sequence]
+                self.__is_dirty = True
+
+        return num_scanned
+
+    def save(self):
+        if self.__manifest_path is None or not self.__is_dirty:
+            return
+
+        manifest = {
+            "version": self.__MANIFEST_VERSION,
+            "keypresses_path": self.__keypresses_path,
+            "cases": {
+                target_sequence: {
+                    "signature": self.__signatures[target_sequence],
+                    "presses": {
+                        str(idx): None if window is None else list(window)
+                        for idx, window in windows.items()
+                    },
+                }
+                for target_sequence, windows in self.__cases.items()
+            },
+        }
+
+        with NamedTemporaryFile(
+            "w",
+            dir=dirname(abspath(self.__manifest_path)),
+            suffix=".tmp",
+            delete=False
+        ) as manifest_file:
+            dump(manifest, manifest_file)
+
+        replace(manifest_file.name, self.__manifest_path)
+        self.__is_dirty = False
+
+    def get_press_windows(self, target_sequence: str) -> list[tuple[int, int]]:
+        if target_sequence not in self.__cases:
+            raise FileNotFoundError(
+                f"No keypresses for '{target_sequence}' in {self.__keypresses_path}."
+            )
+
+        windows = self.__cases[target_sequence]
+
+        presses: list[tuple[int, int]] = []
+        for idx in range(1, len(target_sequence) + 1):
+            if idx not in windows:
+                raise FileNotFoundError(
+                    f"No keypress folder {idx} for '{target_sequence}' in {self.__keypresses_path}."
+                )
+
+            if windows[idx] is not None:
+                presses.append(windows[idx])
+
+        return presses
@@ -0,0 +1,186 @@
+import sqlite3
+from array import array
+from hashlib import blake2b
+from json import dumps
+from os import stat
+from os.path import abspath
+from time import time
+from motion_decipher.pose_estimation import Landmarks
+
+
+def file_digest(file_path: str, chunk_size: int = 1 << 20) -> str:
+    hasher = blake2b(digest_size=20)
+
+    with open(file_path, "rb") as input_file:
+        while chunk := input_file.read(chunk_size):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+class LandmarkCache:
+    __connection: sqlite3.Connection
+    __max_bytes: int
+    __hashes: dict[str, str]
+    __pending_rows: list[tuple[str, str, int, bytes | None, float]]
+    __pending_accesses: list[tuple[float, str, str, int, int]]
+
+    __ROW_OVERHEAD: int = 64
+    __HASH_CHUNK_SIZE: int = 1 << 20
+
+    def __init__(self, cache_path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.__max_bytes = max_bytes
+        self.__hashes = {}
+        self.__pending_rows = []
+        self.__pending_accesses = []
+
+        self.__connection = sqlite3.connect(cache_path, timeout=60.0)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS landmarks (
+                video_hash TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                frame_idx INTEGER NOT NULL,
+                landmarks BLOB,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (video_hash, settings, frame_idx)
+            );
+            CREATE INDEX IF NOT EXISTS landmarks_accessed ON landmarks (accessed);
+        """)
+        self.__connection.commit()
+
+    def __enter__(self) -> "LandmarkCache":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @staticmethod
+    def settings_key(settings: dict[str, object]) -> str:
+        return dumps(settings, sort_keys=True)
+
+    @staticmethod
+    def __pack__(landmarks: Landmarks | None) -> bytes | None:
+        if landmarks is None:
+            return None
+
+        return array("d", [value for landmark in landmarks for value in landmark]).tobytes()
+
+    @staticmethod
+    def __unpack__(data: bytes | None) -> Landmarks | None:
+        if data is None:
+            return None
+
+        values = array("d")
+        values.frombytes(data)
+
+        return tuple(
+            (values[idx], values[idx + 1], values[idx + 2])
+            for idx in range(0, len(values), 3)
+        )
+
+    def video_hash(self, video_path: str) -> str:
+        video_path = abspath(video_path)
+        if video_path in self.__hashes:
+            return self.__hashes[video_path]
+
+        video_stat = stat(video_path)
+        row = self.__connection.execute(
+            "SELECT digest FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (video_path, video_stat.st_size, video_stat.st_mtime_ns)
+        ).fetchone()
+
+        if row is not None:
+            digest: str = row[0]
+        else:
+            digest = file_digest(video_path, self.__HASH_CHUNK_SIZE)
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                (video_path, video_stat.st_size, video_stat.st_mtime_ns, digest)
+            )
+            self.__connection.commit()
+
+        self.__hashes[video_path] = digest
+        return digest
+
+    def lookup(
+        self,
+        video_hash: str,
+        settings: str,
+        min_idx: int,
+        max_idx: int
+    ) -> dict[int, Landmarks | None]:
+        rows = self.__connection.execute(
+            "SELECT frame_idx, landmarks FROM landmarks "
+            "WHERE video_hash = ? AND settings = ? AND frame_idx BETWEEN ? AND ?",
+            (video_hash, settings, min_idx, max_idx)
+        ).fetchall()
+
+        if len(rows) > 0:
+            self.__pending_accesses.append((time(), video_hash, settings, min_idx, max_idx))
+
+        return { frame_idx: self.__unpack__(data) for frame_idx, data in rows }
+
+    def store(
+        self,
+        video_hash: str,
+        settings: str,
+        frame_idx: int,
+        landmarks: Landmarks | None
+    ):
+        self.__pending_rows.append(
+            (video_hash, settings, frame_idx, self.__pack__(landmarks), time())
+        )
+
+    def commit(self):
+        if len(self.__pending_rows) > 0 or len(self.__pending_accesses) > 0:
+            self.__connection.executemany(
+                "UPDATE landmarks SET accessed = ? "
+                "WHERE video_hash = ? AND settings = ? AND frame_idx BETWEEN ? AND ?",
+                self.__pending_accesses
+            )
+            self.__connection.executemany(
+                "INSERT OR REPLACE INTO landmarks VALUES (?, ?, ?, ?, ?)",
+                self.__pending_rows
+            )
+            self.__connection.commit()
+
+            self.__pending_rows = []
+            self.__pending_accesses = []
+
+        self.__evict__()
+
+    def __evict__(self):
+        total_bytes, = self.__connection.execute(
+            "SELECT COALESCE(SUM(COALESCE(LENGTH(landmarks), 0) + ?), 0) FROM landmarks",
+            (self.__ROW_OVERHEAD,)
+        ).fetchone()
+
+        if total_bytes <= self.__max_bytes:
+            return
+
+        excess_bytes = total_bytes - self.__max_bytes
+        rows = self.__connection.execute(
+            "SELECT rowid, COALESCE(LENGTH(landmarks), 0) + ? FROM landmarks ORDER BY accessed",
+            (self.__ROW_OVERHEAD,)
+        )
+
+        evicted: list[tuple[int]] = []
+        for rowid, row_bytes in rows:
+            if excess_bytes <= 0:
+                break
+
+            evicted.append((rowid,))
+            excess_bytes -= row_bytes
+
+        self.__connection.executemany("DELETE FROM landmarks WHERE rowid = ?", evicted)
+        self.__connection.commit()
+
+    def close(self):
+        self.commit()
+        self.__connection.close()
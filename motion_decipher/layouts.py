@@ -0,0 +1,356 @@
+import numpy as np
+from hashlib import blake2b
+from os import chmod, makedirs, replace
+from os.path import join, isfile
+from tempfile import NamedTemporaryFile
+from motion_decipher.math import compute_angle_deg, compute_distance
+
+
+class KeypadLayout:
+    __slots__ = (
+        "__name",
+        "__characters",
+        "__key_positions",
+        "__dis_groups",
+        "__dir_groups",
+        "__num_columns",
+        "__num_rows",
+        "__column_width",
+        "__row_height",
+    )
+
+    __name: str
+    __characters: str
+    __key_positions: tuple[tuple[float, float], ...]
+    __dis_groups: tuple[tuple[float, float], ...]
+    __dir_groups: tuple[float, ...]
+    __num_columns: int
+    __num_rows: int
+    __column_width: float
+    __row_height: float
+
+    def __init__(
+        self,
+        name: str,
+        characters: str,
+        key_positions: list[tuple[float, float]],
+        dis_groups: list[tuple[float, float]],
+        num_columns: int,
+        num_rows: int,
+        column_width: float,
+        row_height: float,
+        dir_groups: list[float] | None = None
+    ):
+        if len(characters) != len(key_positions):
+            raise ValueError("Every key position requires exactly one character.")
+
+        if not characters.isascii():
+            raise ValueError("Keypad characters must be ASCII.")
+
+        if len(key_positions) > 64:
+            raise ValueError("Keypad layouts are limited to 64 keys.")
+
+        self.__name = name
+        self.__characters = characters
+        self.__key_positions = tuple(key_positions)
+        self.__dis_groups = tuple(dis_groups)
+        self.__dir_groups = tuple(dir_groups if dir_groups is not None else [
+            0.0, #EAST
+            45.0, #NORTHEAST
+            90.0, #NORTH
+            135.0, #NORTHWEST
+            180.0, #WEST
+            225.0, #SOUTHWEST
+            270.0, #SOUTH
+            315.0, #SOUTHEAST
+        ])
+        self.__num_columns = num_columns
+        self.__num_rows = num_rows
+        self.__column_width = column_width
+        self.__row_height = row_height
+
+    def get_name(self) -> str:
+        return self.__name
+
+    def get_characters(self) -> str:
+        return self.__characters
+
+    def get_key_positions(self) -> tuple[tuple[float, float], ...]:
+        return self.__key_positions
+
+    def get_dis_groups(self) -> tuple[tuple[float, float], ...]:
+        return self.__dis_groups
+
+    def get_dir_groups(self) -> tuple[float, ...]:
+        return self.__dir_groups
+
+    def get_scales(self) -> list[tuple[float, float]]:
+        return [
+            (column_count * self.__column_width, row_count * self.__row_height)
+            for column_count in range(1, self.__num_columns + 1)
+            for row_count in range(1, self.__num_rows + 1)
+        ]
+
+__TABLE_VERSION: int = 1
+__TABLE_FOLDER: str | None = None
+__TABLE_MODE: int = 0o644
+
+__LAYOUTS: dict[str, KeypadLayout] = {}
+__TRANSITION_TABLES: dict[str, np.ndarray] = {}
+
+def __get_directions__(angle: float, dir_groups: tuple[float, ...], delta_t: float = 22.5) -> list[int]:
+    min_distance: float = float("inf")
+    min_idx: int = -1
+
+    for g_idx in range(len(dir_groups)):
+        true_angle = dir_groups[g_idx]
+
+        lower = (true_angle - delta_t + 360.0) % 360.0
+        upper = (true_angle + delta_t) % 360.0
+
+        if lower <= angle <= upper:
+            return [g_idx]
+
+        if lower > true_angle:
+            if angle >= lower or angle <= upper:
+                return [g_idx]
+
+        g_min_distance = abs(angle - true_angle)
+        if g_min_distance < min_distance:
+            min_idx = g_idx
+            min_distance = g_min_distance
+
+    if angle > dir_groups[min_idx]:
+        return [min_idx, (min_idx + 1) % len(dir_groups)]
+
+    return [(min_idx - 1 + len(dir_groups)) % len(dir_groups), min_idx]
+
+def __get_distances__(distance: float, dis_groups: tuple[tuple[float, float], ...]) -> list[int]:
+    min_distance: float = float("inf")
+    min_idx: int = -1
+
+    for g_idx in range(len(dis_groups)):
+        min_g, max_g = dis_groups[g_idx]
+
+        if min_g <= distance <= max_g:
+            return [g_idx]
+
+        g_min_distance = min(abs(min_g - distance), abs(max_g - distance))
+        if g_min_distance < min_distance:
+            min_idx = g_idx
+            min_distance = g_min_distance
+
+    if distance < dis_groups[min_idx][0] and min_idx != 0:
+        return [min_idx - 1, min_idx]
+
+    if distance > dis_groups[min_idx][1] and min_idx != len(dis_groups) - 1:
+        return [min_idx, min_idx + 1]
+
+    return [min_idx]
+
+def __layout_digest__(layout: KeypadLayout) -> str:
+    global __TABLE_VERSION
+
+    return blake2b(repr((
+        __TABLE_VERSION,
+        layout.get_characters(),
+        layout.get_key_positions(),
+        layout.get_dis_groups(),
+        layout.get_dir_groups(),
+    )).encode(), digest_size=8).hexdigest()
+
+def __mask_dtype__(num_bits: int) -> type:
+    if num_bits <= 16:
+        return np.uint16
+    if num_bits <= 32:
+        return np.uint32
+    return np.uint64
+
+def compile_layout(layout: KeypadLayout) -> np.ndarray:
+    key_positions = layout.get_key_positions()
+    dir_groups = layout.get_dir_groups()
+    dis_groups = layout.get_dis_groups()
+    num_keys = len(key_positions)
+
+    dir_table = np.zeros((num_keys, len(dir_groups), num_keys), dtype=bool)
+    dis_table = np.zeros((num_keys, len(dis_groups), num_keys), dtype=bool)
+
+    for from_idx in range(num_keys):
+        from_pos = key_positions[from_idx]
+        dir_table[from_idx, :, from_idx] = True
+
+        for to_idx in range(num_keys):
+            to_pos = key_positions[to_idx]
+
+            for dis_feature in __get_distances__(compute_distance(from_pos, to_pos), dis_groups):
+                dis_table[from_idx, dis_feature, to_idx] = True
+
+            if to_idx == from_idx:
+                continue
+
+            for dir_feature in __get_directions__(compute_angle_deg(from_pos, to_pos), dir_groups, 22.5):
+                dir_table[from_idx, dir_feature, to_idx] = True
+
+    key_bits = np.left_shift(
+        np.ones(num_keys, dtype=np.uint64),
+        np.arange(num_keys, dtype=np.uint64)
+    )
+    shared_keys = dir_table[:, :, np.newaxis, :] & dis_table[:, np.newaxis, :, :]
+
+    transition_masks = np.zeros(
+        (num_keys, len(dir_groups) + 1, len(dis_groups) + 1),
+        dtype=__mask_dtype__(num_keys)
+    )
+    transition_masks[:, :-1, :-1] = np.bitwise_or.reduce(
+        np.where(shared_keys, key_bits, np.uint64(0)),
+        axis=-1
+    )
+
+    return transition_masks
+
+def set_table_folder(table_folder: str | None):
+    global __TABLE_FOLDER
+    __TABLE_FOLDER = table_folder
+
+def register_layout(layout: KeypadLayout):
+    global __LAYOUTS, __TRANSITION_TABLES
+
+    __LAYOUTS[layout.get_name()] = layout
+    __TRANSITION_TABLES.pop(layout.get_name(), None)
+
+def get_layout(layout: KeypadLayout | str) -> KeypadLayout:
+    global __LAYOUTS
+
+    if isinstance(layout, KeypadLayout):
+        return layout
+
+    if layout not in __LAYOUTS:
+        raise KeyError(f"Unknown keypad layout '{layout}'.")
+
+    return __LAYOUTS[layout]
+
+def get_layout_names() -> list[str]:
+    global __LAYOUTS
+    return list(__LAYOUTS.keys())
+
+def get_transition_masks(layout: KeypadLayout | str) -> np.ndarray:
+    global __TABLE_FOLDER, __TABLE_VERSION, __TABLE_MODE, __LAYOUTS, __TRANSITION_TABLES
+
+    layout = get_layout(layout)
+    is_registered = __LAYOUTS.get(layout.get_name()) is layout
+
+    if is_registered and layout.get_name() in __TRANSITION_TABLES:
+        return __TRANSITION_TABLES[layout.get_name()]
+
+    if __TABLE_FOLDER is None:
+        transition_masks = compile_layout(layout)
+    else:
+        table_path = join(
+            __TABLE_FOLDER,
+            f"{layout.get_name()}-v{__TABLE_VERSION}-{__layout_digest__(layout)}.npy"
+        )
+
+        try:
+            if not isfile(table_path):
+                makedirs(__TABLE_FOLDER, exist_ok=True)
+
+                with NamedTemporaryFile(dir=__TABLE_FOLDER, suffix=".tmp", delete=False) as table_file:
+                    np.save(table_file, compile_layout(layout), allow_pickle=False)
+
+                chmod(table_file.name, __TABLE_MODE)
+                replace(table_file.name, table_path)
+
+            transition_masks = np.load(table_path, mmap_mode="r", allow_pickle=False)
+        except OSError:
+            transition_masks = compile_layout(layout)
+
+    if is_registered:
+        __TRANSITION_TABLES[layout.get_name()] = transition_masks
+
+    return transition_masks
+
+register_layout(KeypadLayout(
+    "quest_3",
+    "0123456789",
+    [
+        (1.0, 0.0), #0
+        (0.0, 1.8), #1
+        (1.0, 1.8), #2
+        (2.0, 1.8), #3
+        (0.0, 1.2), #4
+        (1.0, 1.2), #5
+        (2.0, 1.2), #6
+        (0.0, 0.6), #7
+        (1.0, 0.6), #8
+        (2.0, 0.6), #9
+    ],
+    [
+        (0.0, 0.0), #G1
+        (0.6, 0.6), #G2
+        (1.0, 1.2), #G3
+        (1.56, 1.57), #G4
+        (1.8, 2.34), #G5
+    ],
+    num_columns=3,
+    num_rows=4,
+    column_width=1.0,
+    row_height=0.6
+))
+
+register_layout(KeypadLayout(
+    "phone",
+    "0123456789",
+    [
+        (1.0, 0.0), #0
+        (0.0, 3.0), #1
+        (1.0, 3.0), #2
+        (2.0, 3.0), #3
+        (0.0, 2.0), #4
+        (1.0, 2.0), #5
+        (2.0, 2.0), #6
+        (0.0, 1.0), #7
+        (1.0, 1.0), #8
+        (2.0, 1.0), #9
+    ],
+    [
+        (0.0, 0.0), #G1
+        (1.0, 1.0), #G2
+        (1.41, 1.42), #G3
+        (2.0, 2.24), #G4
+        (2.82, 3.17), #G5
+        (3.6, 3.61), #G6
+    ],
+    num_columns=3,
+    num_rows=4,
+    column_width=1.0,
+    row_height=1.0
+))
+
+register_layout(KeypadLayout(
+    "atm",
+    "0123456789",
+    [
+        (1.0, 0.0), #0
+        (0.0, 2.25), #1
+        (1.0, 2.25), #2
+        (2.0, 2.25), #3
+        (0.0, 1.5), #4
+        (1.0, 1.5), #5
+        (2.0, 1.5), #6
+        (0.0, 0.75), #7
+        (1.0, 0.75), #8
+        (2.0, 0.75), #9
+    ],
+    [
+        (0.0, 0.0), #G1
+        (0.75, 0.75), #G2
+        (1.0, 1.25), #G3
+        (1.5, 1.81), #G4
+        (2.0, 2.25), #G5
+        (2.46, 3.01), #G6
+    ],
+    num_columns=3,
+    num_rows=4,
+    column_width=1.0,
+    row_height=0.75
+))
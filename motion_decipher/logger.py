@@ -1,22 +1,147 @@
-from typing import Callable
-from time import localtime, strftime
+from json import dumps
+from multiprocessing import get_context, queues
+from os import getpid
+from threading import Thread
+from time import localtime, strftime, time
+from typing import Callable, TextIO
 
 
+LogRecord = tuple[float, int, int, str]
+
+INFO: int = 20
+SUCCESS: int = 25
+WARNING: int = 30
+ERROR: int = 40
+
 __reset: str = "\x1b[0m"
 __blue: str = "\x1b[34m"
 __green: str = "\x1b[32m"
 __yellow: str = "\x1b[33m"
 __red: str = "\x1b[31m"
 
-__info_head: str = '[' + __blue + "INFO" + __reset + "]: "
-__success_head: str = '[' + __green + "SUCCESS" + __reset + "]: "
-__warning_head: str = '[' + __yellow + "WARNING" + __reset + "]: "
-__error_head: str = '[' + __red + "ERROR" + __reset + "]: "
+__level_names: dict[int, str] = {
+    INFO: "INFO",
+    SUCCESS: "SUCCESS",
+    WARNING: "WARNING",
+    ERROR: "ERROR",
+}
+__level_colors: dict[int, str] = {
+    INFO: __blue,
+    SUCCESS: __green,
+    WARNING: __yellow,
+    ERROR: __red,
+}
+
+__min_level: int = INFO
+__json_mode: bool = False
+__log_file: TextIO | None = None
+__log_queue: queues.Queue | None = None
+__listener: Thread | None = None
+
+def __format_record__(record: LogRecord, use_color: bool) -> str:
+    global __json_mode, __level_names, __level_colors, __reset
+
+    timestamp, level, process_id, message = record
+
+    if __json_mode:
+        return dumps({
+            "time": timestamp,
+            "level": __level_names[level].lower(),
+            "pid": process_id,
+            "message": message,
+        })
+
+    level_name = __level_names[level]
+    if use_color:
+        level_name = __level_colors[level] + level_name + __reset
+
+    return f"{strftime('%m/%d/%Y %H:%M:%S', localtime(timestamp))} [{level_name}]: {message}"
+
+def __write_record__(record: LogRecord):
+    global __min_level, __json_mode, __log_file
+
+    if record[1] < __min_level:
+        return
+
+    print(__format_record__(record, not __json_mode))
+
+    if __log_file is not None:
+        __log_file.write(__format_record__(record, False) + "\n")
+        __log_file.flush()
+
+def __listen__(log_queue: queues.Queue):
+    while (record := log_queue.get()) is not None:
+        __write_record__(record)
+
+def __internal_log__(level: int, message: str):
+    global __min_level, __log_queue
+
+    if level < __min_level:
+        return
+
+    record: LogRecord = (time(), level, getpid(), message)
+
+    if __log_queue is None:
+        __write_record__(record)
+        return
+
+    __log_queue.put(record)
+
+def configure(level: int = INFO, json_mode: bool = False, file_path: str | None = None):
+    global __min_level, __json_mode, __log_file
+
+    __min_level = level
+    __json_mode = json_mode
+
+    if __log_file is not None:
+        __log_file.close()
+
+    __log_file = None if file_path is None else open(file_path, "a")
+
+def start_listener() -> queues.Queue:
+    global __log_queue, __listener
+
+    if __listener is not None:
+        return __log_queue
+
+    __log_queue = get_context("spawn").Queue()
+    __listener = Thread(target=__listen__, args=(__log_queue,), daemon=True)
+    __listener.start()
+
+    return __log_queue
+
+def set_queue(log_queue: queues.Queue | None, level: int = INFO):
+    global __log_queue, __min_level
+
+    __log_queue = log_queue
+    __min_level = level
+
+def get_queue() -> queues.Queue | None:
+    global __log_queue
+    return __log_queue
+
+def get_level() -> int:
+    global __min_level
+    return __min_level
+
+def stop_listener():
+    global __log_queue, __listener, __log_file
+
+    if __listener is not None:
+        __log_queue.put(None)
+        __listener.join()
+
+        __log_queue.close()
+        __log_queue.join_thread()
+
+    __log_queue = None
+    __listener = None
 
-def __internal_log__(header: str, message: str):
-    print(f"{strftime('%m/%d/%Y %H:%M:%S', localtime())} {header}{message}")
+    if __log_file is not None:
+        __log_file.close()
+        __log_file = None
 
-log_info: Callable[[str], None] = lambda message : __internal_log__(__info_head, message)
-log_success: Callable[[str], None] = lambda message : __internal_log__(__success_head, message)
-log_warning: Callable[[str], None] = lambda message : __internal_log__(__warning_head, message)
-log_error: Callable[[str], None] = lambda message : __internal_log__(__error_head, message)
\ No newline at end of file
+log_info: Callable[[str], None] = lambda message : __internal_log__(INFO, message)
+log_success: Callable[[str], None] = lambda message : __internal_log__(SUCCESS, message)
+log_warning: Callable[[str], None] = lambda message : __internal_log__(WARNING, message)
+log_error: Callable[[str], None] = lambda message : __internal_log__(ERROR, message)
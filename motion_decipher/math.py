@@ -1,4 +1,4 @@
-from math import pi, sqrt, atan2
+from math import pi, sqrt, atan2, sin, cos
 
 
 RAD_2_DEG: float = 180.0 / pi
@@ -38,4 +38,16 @@ def normalize_3d(points: list[tuple[float, float, float]]) -> list[tuple[float,
         (x - x_min) / (x_max - x_min),
         (y - y_min) / (y_max - y_min),
         (z - z_min) / (z_max - z_min),
-    ) for x, y, z in points]
\ No newline at end of file
+    ) for x, y, z in points]
+
+def project_points(
+    points_3d: list[tuple[float, float, float]],
+    view_angle: float
+) -> list[tuple[float, float]]:
+    view_radians: float = view_angle * pi / 180.0
+    return [
+        (
+            (1.0 - x) * cos(view_radians) + (1.0 - z) * sin(view_radians),
+            1.0 - y
+        ) for x, y, z in points_3d
+    ]
\ No newline at end of file
@@ -0,0 +1,91 @@
+from contextlib import nullcontext
+from time import perf_counter
+
+
+MetricsRecord = dict[str, object]
+
+__enabled: bool = False
+__timers: dict[str, float] = {}
+__counters: dict[str, int] = {}
+__disabled_timer: nullcontext = nullcontext()
+
+class Timer:
+    __slots__ = ("__name", "__start")
+
+    __name: str
+    __start: float
+
+    def __init__(self, name: str):
+        self.__name = name
+        self.__start = 0.0
+
+    def __enter__(self) -> "Timer":
+        self.__start = perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        add_time(self.__name, perf_counter() - self.__start)
+
+def enable(enabled: bool = True):
+    global __enabled
+    __enabled = enabled
+
+def is_enabled() -> bool:
+    global __enabled
+    return __enabled
+
+def timer(name: str) -> Timer | nullcontext:
+    global __enabled, __disabled_timer
+
+    if not __enabled:
+        return __disabled_timer
+
+    return Timer(name)
+
+def add_time(name: str, seconds: float):
+    global __enabled, __timers
+
+    if __enabled:
+        __timers[name] = __timers.get(name, 0.0) + seconds
+
+def count(name: str, amount: int = 1):
+    global __enabled, __counters
+
+    if __enabled:
+        __counters[name] = __counters.get(name, 0) + amount
+
+def reset():
+    global __timers, __counters
+
+    __timers = {}
+    __counters = {}
+
+def snapshot() -> MetricsRecord:
+    global __timers, __counters
+
+    return {
+        "timers": dict(__timers),
+        "counters": dict(__counters),
+    }
+
+def summarize(records: list[MetricsRecord]) -> MetricsRecord:
+    timers: dict[str, float] = {}
+    counters: dict[str, int] = {}
+
+    for record in records:
+        for name, seconds in record.get("timers", {}).items():
+            timers[name] = timers.get(name, 0.0) + seconds
+
+        for name, amount in record.get("counters", {}).items():
+            counters[name] = counters.get(name, 0) + amount
+
+    num_cases = len(records)
+    return {
+        "cases": num_cases,
+        "successes": sum(1 for record in records if record.get("success")),
+        "timers": timers,
+        "mean_timers": {
+            name: seconds / num_cases for name, seconds in timers.items()
+        } if num_cases > 0 else {},
+        "counters": counters,
+    }
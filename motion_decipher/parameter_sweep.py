@@ -0,0 +1,80 @@
+from csv import writer
+from multiprocessing import Pool
+from motion_decipher.math import project_points
+from motion_decipher.quest_3_correlation import quest_3_correlation
+from motion_decipher.layouts import KeypadLayout
+
+
+SweepCase = tuple[str, list[tuple[float, float, float]]]
+SweepRow = tuple[str, float, float, int, bool]
+
+__SWEEP_HEADER: list[str] = [
+    "pin",
+    "view_angle",
+    "delta_t",
+    "candidate_count",
+    "success",
+]
+
+__sweep_cases: list[SweepCase] = []
+__sweep_layout: KeypadLayout | str = "quest_3"
+
+def __init_sweep_worker__(cases: list[SweepCase], layout: KeypadLayout | str):
+    global __sweep_cases, __sweep_layout
+    __sweep_cases = cases
+    __sweep_layout = layout
+
+def __evaluate_grid_point__(view_angle: float, delta_t: float) -> list[SweepRow]:
+    global __sweep_cases, __sweep_layout
+
+    rows: list[SweepRow] = []
+    for target_sequence, points_3d in __sweep_cases:
+        candidates = quest_3_correlation(
+            project_points(points_3d, view_angle),
+            delta_t,
+            __sweep_layout
+        )
+
+        rows.append((
+            target_sequence,
+            view_angle,
+            delta_t,
+            len(candidates),
+            target_sequence in candidates
+        ))
+
+    return rows
+
+def sweep_parameters(
+    cases: list[SweepCase],
+    view_angles: list[float],
+    delta_ts: list[float],
+    max_processes: int = 1,
+    layout: KeypadLayout | str = "quest_3"
+) -> list[SweepRow]:
+    grid: list[tuple[float, float]] = [
+        (view_angle, delta_t)
+        for view_angle in view_angles
+        for delta_t in delta_ts
+    ]
+
+    if max_processes <= 1 or len(grid) <= 1:
+        __init_sweep_worker__(cases, layout)
+        grid_rows = [__evaluate_grid_point__(*point) for point in grid]
+    else:
+        with Pool(
+            processes=min(max_processes, len(grid)),
+            initializer=__init_sweep_worker__,
+            initargs=(cases, layout)
+        ) as process_pool:
+            grid_rows = process_pool.starmap(__evaluate_grid_point__, grid)
+
+    return [row for rows in grid_rows for row in rows]
+
+def write_sweep_table(rows: list[SweepRow], table_path: str):
+    global __SWEEP_HEADER
+
+    with open(table_path, "w", newline="") as table_file:
+        table_writer = writer(table_file)
+        table_writer.writerow(__SWEEP_HEADER)
+        table_writer.writerows(rows)
@@ -0,0 +1,262 @@
+import numpy as np
+import motion_decipher.metrics as metrics
+from multiprocessing import Process, Queue, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty
+from motion_decipher.frame_source import FrameSource
+from typing import Callable
+from motion_decipher.pose_estimation import Triangle, Landmarks, HandPoseEstimator
+
+
+def __inference_worker__(
+    task_queue: Queue,
+    result_queue: Queue,
+    estimator_options: dict[str, object],
+    metrics_enabled: bool = False
+):
+    attached: dict[str, SharedMemory] = {}
+    metrics.enable(metrics_enabled)
+
+    with HandPoseEstimator(**estimator_options) as estimator:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            buffer_name, frame_shape, slot, press_idx, frame_idx = task
+
+            if buffer_name not in attached:
+                for shared_buffer in attached.values():
+                    shared_buffer.close()
+
+                attached = { buffer_name: SharedMemory(name=buffer_name) }
+
+            frame_size = int(np.prod(frame_shape))
+            frame = np.ndarray(
+                frame_shape,
+                dtype=np.uint8,
+                buffer=attached[buffer_name].buf,
+                offset=slot * frame_size
+            )
+
+            metrics.reset()
+            landmarks = next(estimator.estimate_landmarks([frame]))
+            del frame
+
+            inference_time = metrics.snapshot()["timers"].get("inference", 0.0)
+            result_queue.put((slot, press_idx, frame_idx, landmarks, inference_time))
+
+    for shared_buffer in attached.values():
+        shared_buffer.close()
+
+FrameCallback = Callable[[int, int, Landmarks | None], None]
+
+class InferencePipeline:
+    __estimator: HandPoseEstimator
+    __workers: list[Process]
+    __task_queue: Queue
+    __result_queue: Queue
+
+    __ring_size: int
+    __ring_buffer: SharedMemory | None
+    __ring_frames: list[np.ndarray]
+    __frame_shape: tuple[int, ...] | None
+    __free_slots: list[int]
+    __pending: int
+    __on_frame: FrameCallback | None
+
+    __RESULT_TIMEOUT: float = 1.0
+
+    def __init__(
+        self,
+        num_workers: int,
+        ring_size: int | None = None,
+        estimator_options: dict[str, object] | None = None
+    ):
+        if num_workers < 1:
+            raise ValueError("InferencePipeline requires at least one worker.")
+
+        if (estimator_options or {}).get("tracking", False):
+            raise ValueError("InferencePipeline spreads frames across workers and cannot track hands.")
+
+        if (estimator_options or {}).get("roi_padding") is not None:
+            raise ValueError("InferencePipeline spreads frames across workers and cannot crop to a hand ROI.")
+
+        self.__ring_size = ring_size if ring_size is not None else 2 * num_workers
+        self.__ring_buffer = None
+        self.__ring_frames = []
+        self.__frame_shape = None
+        self.__free_slots = []
+        self.__pending = 0
+        self.__on_frame = None
+
+        self.__estimator = HandPoseEstimator(**(estimator_options or {}))
+
+        resource_tracker.ensure_running()
+
+        self.__task_queue = Queue()
+        self.__result_queue = Queue()
+        self.__workers = [
+            Process(
+                target=__inference_worker__,
+                args=(
+                    self.__task_queue,
+                    self.__result_queue,
+                    estimator_options or {},
+                    metrics.is_enabled()
+                ),
+                daemon=True
+            ) for _ in range(num_workers)
+        ]
+
+        for worker in self.__workers:
+            worker.start()
+
+    def __enter__(self) -> "InferencePipeline":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def get_settings(self) -> dict[str, object]:
+        return self.__estimator.get_settings()
+
+    def to_triangle(self, landmarks: Landmarks) -> Triangle:
+        return self.__estimator.to_triangle(landmarks)
+
+    def __allocate_ring__(
+        self,
+        frame_shape: tuple[int, ...],
+        detections: dict[int, tuple[int, Landmarks]]
+    ):
+        if self.__frame_shape == frame_shape:
+            return
+
+        self.__wait_pending__(detections)
+        self.__release_ring__()
+
+        frame_size = int(np.prod(frame_shape))
+        self.__ring_buffer = SharedMemory(
+            create=True,
+            size=frame_size * self.__ring_size
+        )
+        self.__ring_frames = [
+            np.ndarray(
+                frame_shape,
+                dtype=np.uint8,
+                buffer=self.__ring_buffer.buf,
+                offset=slot * frame_size
+            ) for slot in range(self.__ring_size)
+        ]
+        self.__frame_shape = frame_shape
+        self.__free_slots = list(range(self.__ring_size))
+
+    def __release_ring__(self):
+        if self.__ring_buffer is None:
+            return
+
+        self.__ring_frames = []
+        self.__ring_buffer.close()
+        self.__ring_buffer.unlink()
+        self.__ring_buffer = None
+        self.__frame_shape = None
+        self.__free_slots = []
+
+    def __collect__(
+        self,
+        detections: dict[int, tuple[int, Landmarks]],
+        block: bool
+    ) -> bool:
+        try:
+            with metrics.timer("inference_wait"):
+                result = self.__result_queue.get(
+                    block=block,
+                    timeout=self.__RESULT_TIMEOUT if block else None
+                )
+        except Empty:
+            if block and not all(worker.is_alive() for worker in self.__workers):
+                raise RuntimeError("An inference worker exited unexpectedly.")
+
+            return False
+
+        slot, press_idx, frame_idx, landmarks, inference_time = result
+        self.__free_slots.append(slot)
+        self.__pending -= 1
+
+        metrics.add_time("inference", inference_time)
+        metrics.count("frames_inferred")
+        if landmarks is None:
+            metrics.count("detections_missed")
+
+        if self.__on_frame is not None:
+            self.__on_frame(press_idx, frame_idx, landmarks)
+
+        if landmarks is not None and (
+            press_idx not in detections or
+            frame_idx < detections[press_idx][0]
+        ):
+            detections[press_idx] = (frame_idx, landmarks)
+
+        return True
+
+    def __wait_pending__(self, detections: dict[int, tuple[int, Landmarks]]):
+        while self.__pending > 0:
+            self.__collect__(detections, True)
+
+    def close(self):
+        if len(self.__workers) == 0:
+            return
+
+        for _ in self.__workers:
+            self.__task_queue.put(None)
+
+        for worker in self.__workers:
+            worker.join()
+
+        self.__workers = []
+        self.__release_ring__()
+
+    def extract(
+        self,
+        frame_source: FrameSource,
+        presses: list[tuple[int, int]],
+        on_frame: FrameCallback | None = None
+    ) -> list[Triangle | None]:
+        if len(self.__workers) == 0:
+            raise RuntimeError("InferencePipeline has already been closed.")
+
+        self.__on_frame = on_frame
+        detections: dict[int, tuple[int, Landmarks]] = {}
+
+        for press_idx, (min_idx, max_idx) in enumerate(presses):
+            for frame_idx, frame in frame_source.window(min_idx, max_idx):
+                while self.__collect__(detections, False):
+                    pass
+
+                if press_idx in detections:
+                    break
+
+                self.__allocate_ring__(frame.shape, detections)
+                while len(self.__free_slots) == 0:
+                    self.__collect__(detections, True)
+
+                slot = self.__free_slots.pop()
+                np.copyto(self.__ring_frames[slot], frame)
+
+                self.__task_queue.put((
+                    self.__ring_buffer.name,
+                    self.__frame_shape,
+                    slot,
+                    press_idx,
+                    frame_idx
+                ))
+                self.__pending += 1
+
+        self.__wait_pending__(detections)
+        self.__on_frame = None
+
+        return [
+            self.__estimator.to_triangle(detections[press_idx][1])
+            if press_idx in detections else None
+            for press_idx in range(len(presses))
+        ]
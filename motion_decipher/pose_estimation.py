@@ -1,5 +1,7 @@
-import cv2 as cv
-import mediapipe as mp
+import numpy as np
+import motion_decipher.metrics as metrics
+from motion_decipher.frame_source import Frame
+from typing import Generator, Iterable, Protocol
 
 class Triangle:
     __point_a_x: float
@@ -46,12 +48,14 @@ class Triangle:
     
     def draw(
             self,
-            frame: cv.Mat,
+            frame: Frame,
             line_color: tuple[int, int, int] = (0, 255, 0),
             line_thickness: int = 8,
             point_color: tuple[int, int, int] = (0, 0, 255),
             point_radius: int = 15
-        ) -> cv.Mat:
+        ) -> Frame:
+        import cv2 as cv
+
         draw_img = frame.copy()
 
         height, width, _ = draw_img.shape
@@ -79,39 +83,239 @@ class Triangle:
 
         return draw_img
 
+Landmarks = tuple[tuple[float, float, float], ...]
+
+class HandModel(Protocol):
+    def process(self, image: Frame) -> object:
+        ...
+
+    def close(self):
+        ...
+
+class HandPoseEstimator:
+    __hand_model: HandModel | None
+    __settings: dict[str, object]
+    __is_closed: bool
+    __point_a: int
+    __point_b: int
+    __point_c: int
+    __roi_padding: float | None
+    __inference_scale: float
+    __roi: tuple[float, float, float, float] | None
+
+    __MIN_ROI_PIXELS: int = 64
+
+    def __init__(
+        self,
+        point_a: int = 0,
+        point_b: int = 5,
+        point_c: int = 17,
+        max_num_hands: int = 2,
+        min_detection_confidence: float = 0.3,
+        min_tracking_confidence: float = 0.3,
+        roi_padding: float | None = None,
+        inference_scale: float = 1.0,
+        tracking: bool = False
+    ):
+        if not 0.0 < inference_scale <= 1.0:
+            raise ValueError("inference_scale must be in the range (0, 1].")
+
+        if tracking and roi_padding is not None:
+            raise ValueError("Hand ROI cropping cannot be combined with tracking mode.")
+
+        self.__point_a = point_a
+        self.__point_b = point_b
+        self.__point_c = point_c
+        self.__roi_padding = roi_padding
+        self.__inference_scale = inference_scale
+        self.__roi = None
+
+        self.__settings = {
+            "static_image_mode": not tracking,
+            "max_num_hands": max_num_hands,
+            "min_detection_confidence": min_detection_confidence,
+            "min_tracking_confidence": min_tracking_confidence,
+        }
+
+        self.__hand_model = None
+        self.__is_closed = False
+
+    def __enter__(self) -> "HandPoseEstimator":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __get_model__(self) -> HandModel:
+        if self.__is_closed:
+            raise RuntimeError("HandPoseEstimator has already been closed.")
+
+        if self.__hand_model is None:
+            import mediapipe as mp
+
+            self.__hand_model = mp.solutions.hands.Hands(**self.__settings)
+
+        return self.__hand_model
+
+    def __infer__(self, image: Frame) -> Landmarks | None:
+        if self.__inference_scale < 1.0:
+            import cv2 as cv
+
+            image = cv.resize(
+                image,
+                None,
+                fx=self.__inference_scale,
+                fy=self.__inference_scale,
+                interpolation=cv.INTER_AREA
+            )
+
+        with metrics.timer("inference"):
+            results = self.__get_model__().process(np.ascontiguousarray(image))
+
+        if not results.multi_hand_landmarks:
+            return None
+
+        return tuple(
+            (landmark.x, landmark.y, landmark.z)
+            for landmark in results.multi_hand_landmarks[0].landmark
+        )
+
+    def __update_roi__(self, landmarks: Landmarks | None, frame_shape: tuple[int, ...]):
+        if self.__roi_padding is None or landmarks is None:
+            self.__roi = None
+            return
+
+        height, width = frame_shape[:2]
+        xs = [landmark[0] * width for landmark in landmarks]
+        ys = [landmark[1] * height for landmark in landmarks]
+
+        center_x = (min(xs) + max(xs)) / 2.0
+        center_y = (min(ys) + max(ys)) / 2.0
+        half_size = max(
+            max(max(xs) - min(xs), max(ys) - min(ys)) * (1.0 + 2.0 * self.__roi_padding),
+            self.__MIN_ROI_PIXELS
+        ) / 2.0
+
+        self.__roi = (
+            max(0.0, (center_x - half_size) / width),
+            max(0.0, (center_y - half_size) / height),
+            min(1.0, (center_x + half_size) / width),
+            min(1.0, (center_y + half_size) / height),
+        )
+
+    def __infer_roi__(self, frame: Frame) -> Landmarks | None:
+        height, width = frame.shape[:2]
+        min_x, min_y, max_x, max_y = self.__roi
+
+        x0, y0 = int(min_x * width), int(min_y * height)
+        x1, y1 = int(round(max_x * width)), int(round(max_y * height))
+        if x1 - x0 <= 1 or y1 - y0 <= 1:
+            return None
+
+        landmarks = self.__infer__(frame[y0:y1, x0:x1])
+        if landmarks is None:
+            return None
+
+        crop_width = (x1 - x0) / width
+        crop_height = (y1 - y0) / height
+
+        return tuple(
+            (
+                x0 / width + x * crop_width,
+                y0 / height + y * crop_height,
+                z * crop_width
+            )
+            for x, y, z in landmarks
+        )
+
+    def get_settings(self) -> dict[str, object]:
+        return {
+            **self.__settings,
+            "roi_padding": self.__roi_padding,
+            "inference_scale": self.__inference_scale,
+        }
+
+    def reset_tracking(self):
+        if self.__hand_model is None or self.__settings["static_image_mode"]:
+            return
+
+        if hasattr(self.__hand_model, "reset"):
+            self.__hand_model.reset()
+            return
+
+        self.__hand_model.close()
+        self.__hand_model = None
+
+    def reset(self):
+        self.__roi = None
+        self.reset_tracking()
+
+    def close(self):
+        self.__is_closed = True
+
+        if self.__hand_model is None:
+            return
+
+        self.__hand_model.close()
+        self.__hand_model = None
+
+    def to_triangle(self, landmarks: Landmarks) -> Triangle:
+        return Triangle(
+            landmarks[self.__point_a][0],
+            landmarks[self.__point_a][1],
+
+            landmarks[self.__point_b][0],
+            landmarks[self.__point_b][1],
+
+            landmarks[self.__point_c][0],
+            landmarks[self.__point_c][1],
+        )
+
+    def estimate_landmarks(self, frames: Iterable[Frame]) -> Generator[Landmarks | None, None, None]:
+        self.__get_model__()
+
+        for frame in frames:
+            landmarks: Landmarks | None = None
+
+            if self.__roi is not None:
+                landmarks = self.__infer_roi__(frame)
+
+                if landmarks is None:
+                    metrics.count("roi_fallbacks")
+
+            if landmarks is None:
+                landmarks = self.__infer__(frame)
+
+            metrics.count("frames_inferred")
+            self.__update_roi__(landmarks, frame.shape)
+
+            if landmarks is None:
+                metrics.count("detections_missed")
+
+            yield landmarks
+
+    def estimate(self, frames: Iterable[Frame]) -> Generator[Triangle | None, None, None]:
+        for landmarks in self.estimate_landmarks(frames):
+            yield None if landmarks is None else self.to_triangle(landmarks)
+
 def pose_estimation(
-    frames: list[cv.Mat],
+    frames: list[Frame],
     point_a: int = 0,
     point_b: int = 5,
     point_c: int = 17,
+    estimator: HandPoseEstimator | None = None
 ) -> list[Triangle]:
     if len(frames) == 0:
         return []
 
-    hand_poses: list[Triangle] = []
-
-    with mp.solutions.hands.Hands(
-        static_image_mode=True,
-        max_num_hands=2,
-        min_detection_confidence=0.3,
-        min_tracking_confidence=0.3
-    ) as hand_model:
-        for frame in frames:
-            results = hand_model.process(frame)
-
-            if not results.multi_hand_landmarks:
-                continue
-
-            hand_marks = results.multi_hand_landmarks[0]
-            hand_poses.append(Triangle(
-                hand_marks.landmark[point_a].x,
-                hand_marks.landmark[point_a].y,
-                
-                hand_marks.landmark[point_b].x,
-                hand_marks.landmark[point_b].y,
-
-                hand_marks.landmark[point_c].x,
-                hand_marks.landmark[point_c].y,
-            ))
+    if estimator is not None:
+        return [
+            triangle for triangle in estimator.estimate(frames)
+            if triangle is not None
+        ]
 
-    return hand_poses
\ No newline at end of file
+    with HandPoseEstimator(point_a, point_b, point_c) as hand_estimator:
+        return [
+            triangle for triangle in hand_estimator.estimate(frames)
+            if triangle is not None
+        ]
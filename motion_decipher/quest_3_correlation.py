@@ -1,207 +1,375 @@
+import numpy as np
+from concurrent.futures import Executor
+from itertools import repeat
 from typing import Generator
-from motion_decipher.math import compute_angle_deg, compute_distance
-
-
-__NUM_COLUMNS: int = 3
-__NUM_ROWS: int = 4
-
-__COLUMN_WIDTH: float = 1.0
-__ROW_HEIGHT: float = 0.6
-
-__DIS_GROUPS: list[tuple[float, float]] = [
-    (0.0, 0.0), #G1
-    (0.6, 0.6), #G2
-    (1.0, 1.2), #G3
-    (1.56, 1.57), #G4
-    (1.8, 2.34), #G5
-]
-
-__DIR_GROUPS: list[float] = [
-    0.0, #EAST
-    45.0, #NORTHEAST
-    90.0, #NORTH
-    135.0, #NORTHWEST
-    180.0, #WEST
-    225.0, #SOUTHWEST
-    270.0, #SOUTH
-    315.0, #SOUTHEAST
-]
-
-__KEY_POSITIONS: list[tuple[float, float]] = [
-    (1.0, 0.0), #0
-    (0.0, 1.8), #1
-    (1.0, 1.8), #2
-    (2.0, 1.8), #3
-    (0.0, 1.2), #4
-    (1.0, 1.2), #5
-    (2.0, 1.2), #6
-    (0.0, 0.6), #7
-    (1.0, 0.6), #8
-    (2.0, 0.6), #9
-]
+from motion_decipher.math import RAD_2_DEG
+from motion_decipher.layouts import KeypadLayout, get_layout, get_transition_masks
+
+
+def __scale_points__(input_points: list[tuple[float, float]], layout: KeypadLayout) -> np.ndarray:
+    scales = np.array(layout.get_scales(), dtype=np.float64)
+
+    points = np.asarray(input_points, dtype=np.float64)
+    return points[np.newaxis, :, :] * scales[:, np.newaxis, :]
+
+def __classify_directions__(
+    angles: np.ndarray,
+    dir_groups: tuple[float, ...],
+    delta_t: float
+) -> np.ndarray:
+    true_angles = np.array(dir_groups, dtype=np.float64)
+    num_groups = len(true_angles)
+
+    lower = ((true_angles - delta_t + 360.0) % 360.0)[:, np.newaxis]
+    upper = ((true_angles + delta_t) % 360.0)[:, np.newaxis]
+    wraps = lower > true_angles[:, np.newaxis]
+
+    flat_angles = angles.reshape(1, -1)
+    matches = (
+        ((lower <= flat_angles) & (flat_angles <= upper)) |
+        (wraps & ((flat_angles >= lower) | (flat_angles <= upper)))
+    )
+    has_match = matches.any(axis=0)
+    match_idx = matches.argmax(axis=0)
+
+    min_idx = np.abs(flat_angles - true_angles[:, np.newaxis]).argmin(axis=0)
+    is_above = flat_angles[0] > true_angles[min_idx]
+
+    directions = np.empty((flat_angles.shape[1], 2), dtype=np.int64)
+    directions[:, 0] = np.where(
+        has_match,
+        match_idx,
+        np.where(is_above, min_idx, (min_idx - 1 + num_groups) % num_groups)
+    )
+    directions[:, 1] = np.where(
+        has_match,
+        -1,
+        np.where(is_above, (min_idx + 1) % num_groups, min_idx)
+    )
+
+    return directions.reshape(angles.shape + (2,))
+
+def __classify_distances__(
+    distances: np.ndarray,
+    dis_groups: tuple[tuple[float, float], ...]
+) -> np.ndarray:
+    group_bounds = np.array(dis_groups, dtype=np.float64)
+    min_g = group_bounds[:, 0, np.newaxis]
+    max_g = group_bounds[:, 1, np.newaxis]
+    last_idx = len(group_bounds) - 1
+
+    flat_distances = distances.reshape(1, -1)
+    matches = (min_g <= flat_distances) & (flat_distances <= max_g)
+    has_match = matches.any(axis=0)
+    match_idx = matches.argmax(axis=0)
+
+    min_idx = np.minimum(
+        np.abs(min_g - flat_distances),
+        np.abs(max_g - flat_distances)
+    ).argmin(axis=0)
+    is_below = (flat_distances[0] < group_bounds[min_idx, 0]) & (min_idx != 0)
+    is_above = (
+        ~is_below &
+        (flat_distances[0] > group_bounds[min_idx, 1]) &
+        (min_idx != last_idx)
+    )
+
+    groups = np.empty((flat_distances.shape[1], 2), dtype=np.int64)
+    groups[:, 0] = np.where(
+        has_match,
+        match_idx,
+        np.where(is_below, min_idx - 1, min_idx)
+    )
+    groups[:, 1] = np.where(
+        has_match,
+        -1,
+        np.where(is_below, min_idx, np.where(is_above, min_idx + 1, -1))
+    )
+
+    return groups.reshape(distances.shape + (2,))
+
+def __feature_extraction__(
+    scaled_points: np.ndarray,
+    layout: KeypadLayout,
+    delta_t: float
+) -> tuple[np.ndarray, np.ndarray]:
+    global RAD_2_DEG
+
+    deltas = scaled_points[:, 1:, :] - scaled_points[:, :-1, :]
+
+    angles = (360.0 + np.arctan2(deltas[:, :, 1], deltas[:, :, 0]) * RAD_2_DEG) % 360.0
+    distances = np.sqrt(deltas[:, :, 0] ** 2.0 + deltas[:, :, 1] ** 2.0)
+
+    return (
+        __classify_directions__(angles, layout.get_dir_groups(), delta_t),
+        __classify_distances__(distances, layout.get_dis_groups())
+    )
+
+def __step_masks__(
+    transition_masks: np.ndarray,
+    dir_groups: np.ndarray,
+    dis_groups: np.ndarray
+) -> np.ndarray:
+    step_masks = np.zeros(
+        (transition_masks.shape[0],) + dir_groups.shape[:-1],
+        dtype=transition_masks.dtype
+    )
+
+    for dir_slot in range(dir_groups.shape[-1]):
+        for dis_slot in range(dis_groups.shape[-1]):
+            step_masks |= transition_masks[
+                :, dir_groups[..., dir_slot], dis_groups[..., dis_slot]
+            ]
+
+    return np.moveaxis(step_masks, 0, -1)
+
+def __layout_step_masks__(
+    input_points: list[tuple[float, float]],
+    layout: KeypadLayout,
+    delta_t: float
+) -> np.ndarray:
+    dir_groups, dis_groups = __feature_extraction__(
+        __scale_points__(input_points, layout),
+        layout,
+        delta_t
+    )
+
+    return __step_masks__(get_transition_masks(layout), dir_groups, dis_groups)
+
+def __expand_sequences__(step_masks: np.ndarray, first_keys: np.ndarray | None = None) -> np.ndarray:
+    key_bits = np.arange(step_masks.shape[-1], dtype=step_masks.dtype)
+
+    if first_keys is None:
+        first_keys = np.arange(step_masks.shape[-1], dtype=np.uint8)
+    layers: list[tuple[np.ndarray, np.ndarray]] = []
+
+    keys = first_keys
+    for masks in step_masks:
+        parents, keys = np.nonzero((masks[keys][:, np.newaxis] >> key_bits) & 1)
+        keys = keys.astype(np.uint8)
+        layers.append((parents, keys))
+
+        if len(keys) == 0:
+            return np.empty((0, len(step_masks) + 1), dtype=np.uint8)
+
+    sequences = np.empty((len(keys), len(step_masks) + 1), dtype=np.uint8)
+    node_idx = np.arange(len(keys))
+
+    for step_idx in range(len(layers) - 1, -1, -1):
+        parents, keys = layers[step_idx]
+        sequences[:, step_idx + 1] = keys[node_idx]
+        node_idx = parents[node_idx]
+
+    sequences[:, 0] = first_keys[node_idx]
+    return sequences
+
+def __expand_partition__(step_masks: np.ndarray, first_key: int) -> np.ndarray:
+    first_keys = np.array([first_key], dtype=np.uint8)
+
+    return np.unique(np.concatenate([
+        __expand_sequences__(scale_masks, first_keys) for scale_masks in step_masks
+    ]), axis=0)
+
+def __to_strings__(sequences: np.ndarray, characters: str) -> list[str]:
+    if len(sequences) == 0:
+        return []
+
+    character_codes = np.frombuffer(characters.encode("ascii"), dtype=np.uint8)
+    digits = np.ascontiguousarray(character_codes[sequences])
+    return digits.view(f"S{sequences.shape[1]}").ravel().astype(str).tolist()
+
+def quest_3_correlation(
+    input_points: list[tuple[float, float]],
+    delta_t: float = 14.5,
+    layout: KeypadLayout | str = "quest_3",
+    executor: Executor | None = None
+) -> list[str]:
+    layout = get_layout(layout)
 
-__DIS_TABLE: dict[str, dict[int, set[str]]] | None = None
-__DIR_TABLE: dict[str, dict[int, set[str]]] | None = None
-
-def __scale_points__(input_points: list[tuple[float, float]]) -> Generator[list[tuple[float, float]], None, None]:
-    global __NUM_COLUMNS, __COLUMN_WIDTH, __NUM_ROWS, __ROW_HEIGHT
-
-    for column_count in range(1, __NUM_COLUMNS + 1):
-        x_scale = column_count * __COLUMN_WIDTH
-
-        for row_count in range(1, __NUM_ROWS + 1):
-            y_scale = row_count * __ROW_HEIGHT
-
-            yield [(x * x_scale, y * y_scale) for x, y in input_points]
-
-def __get_directions__(angle: float, delta_t: float = 22.5) -> list[int]:
-    global __DIR_GROUPS
-
-    min_distance: float = float("inf")
-    min_idx: int = -1
+    match len(input_points):
+        case 0:
+            return []
+        case 1:
+            return list(layout.get_characters())
 
-    for g_idx in range(len(__DIR_GROUPS)):
-        true_angle = __DIR_GROUPS[g_idx]
+    step_masks = __layout_step_masks__(input_points, layout, delta_t)
 
-        lower = (true_angle - delta_t + 360.0) % 360.0
-        upper = (true_angle + delta_t) % 360.0
+    if executor is not None:
+        results: list[str] = []
 
-        if lower <= angle <= upper:
-            return [g_idx]
+        for sequences in executor.map(
+            __expand_partition__,
+            repeat(step_masks),
+            range(step_masks.shape[-1])
+        ):
+            results.extend(__to_strings__(sequences, layout.get_characters()))
 
-        if lower > true_angle:
-            if angle >= lower or angle <= upper:
-                return [g_idx]
+        return results
 
-        g_min_distance = abs(angle - true_angle)
-        if g_min_distance < min_distance:
-            min_idx = g_idx
-            min_distance = g_min_distance
+    sequences = np.concatenate([
+        __expand_sequences__(scale_masks) for scale_masks in step_masks
+    ])
 
-    if angle > __DIR_GROUPS[min_idx]:
-        return [min_idx, (min_idx + 1) % len(__DIR_GROUPS)]
-    
-    return [(min_idx - 1 + len(__DIR_GROUPS)) % len(__DIR_GROUPS), min_idx]
+    return __to_strings__(np.unique(sequences, axis=0), layout.get_characters())
 
-def __get_distances__(distance: float) -> list[int]:
-    global __DIS_GROUPS
+def __iter_sequences__(step_masks: list[list[int]]) -> Generator[list[int], None, None]:
+    num_steps = len(step_masks)
+    sequence: list[int] = [0] * (num_steps + 1)
+    remaining: list[int] = [0] * num_steps
 
-    min_distance: float = float("inf")
-    min_idx: int = -1
+    for first_key in range(len(step_masks[0])):
+        sequence[0] = first_key
+        remaining[0] = step_masks[0][first_key]
+        depth = 0
 
-    for g_idx in range(len(__DIS_GROUPS)):
-        min_g, max_g = __DIS_GROUPS[g_idx]
+        while depth >= 0:
+            bits = remaining[depth]
+            if bits == 0:
+                depth -= 1
+                continue
 
-        if min_g <= distance <= max_g:
-            return [g_idx]
-        
-        g_min_distance = min(abs(min_g - distance), abs(max_g - distance))
-        if g_min_distance < min_distance:
-            min_idx = g_idx
-            min_distance = g_min_distance
+            lowest_bit = bits & -bits
+            remaining[depth] = bits ^ lowest_bit
 
-    if distance < __DIS_GROUPS[min_idx][0] and min_idx != 0:
-        return [min_idx - 1, min_idx]
-    
-    if distance > __DIS_GROUPS[min_idx][1] and min_idx != len(__DIS_GROUPS) - 1:
-        return [min_idx, min_idx + 1]
-    
-    return [min_idx]
-
-def __feature_extraction__(input_points: list[tuple[float, float]], delta_t: float) -> list[tuple[list[int], list[int]]]:
-    features: list[tuple[list[int], list[int]]] = []
-    last_point = input_points[0]
-
-    for cur_point in input_points[1:]:
-        angle = compute_angle_deg(last_point, cur_point)
-        distance = compute_distance(last_point, cur_point)
+            key = lowest_bit.bit_length() - 1
+            sequence[depth + 1] = key
 
-        features.append((__get_directions__(angle, delta_t), __get_distances__(distance)))
-
-        last_point = cur_point
+            if depth + 1 == num_steps:
+                yield sequence
+                continue
 
-    return features
+            depth += 1
+            remaining[depth] = step_masks[depth][key]
 
-def __build_dir_table__():
-    global __DIR_TABLE, __KEY_POSITIONS, __DIR_GROUPS
+def __accepts__(step_masks: list[list[int]], sequence: list[int]) -> bool:
+    for step_idx in range(len(step_masks)):
+        if not (step_masks[step_idx][sequence[step_idx]] >> sequence[step_idx + 1]) & 1:
+            return False
 
-    __DIR_TABLE = {}
-    for from_idx in range(len(__KEY_POSITIONS)):
-        from_key = str(from_idx)
-        from_pos = __KEY_POSITIONS[from_idx]
+    return True
 
-        __DIR_TABLE[from_key] = {}
+def iter_quest_3_correlation(
+    input_points: list[tuple[float, float]],
+    delta_t: float = 14.5,
+    max_candidates: int | None = None,
+    target: str | None = None,
+    layout: KeypadLayout | str = "quest_3"
+) -> Generator[str, None, None]:
+    layout = get_layout(layout)
+    characters = layout.get_characters()
 
-        for g_idx in range(len(__DIR_GROUPS)):
-            __DIR_TABLE[from_key][g_idx] = { from_key }
+    if max_candidates is not None and max_candidates <= 0:
+        return
 
-        for to_idx in range(len(__KEY_POSITIONS)):
-            if to_idx == from_idx:
+    match len(input_points):
+        case 0:
+            return
+        case 1:
+            for candidate in characters[:max_candidates]:
+                yield candidate
+
+                if candidate == target:
+                    return
+            return
+
+    scale_masks: list[list[list[int]]] = __layout_step_masks__(
+        input_points, layout, delta_t
+    ).tolist()
+
+    num_candidates: int = 0
+    for scale_idx, step_masks in enumerate(scale_masks):
+        for sequence in __iter_sequences__(step_masks):
+            if any(
+                __accepts__(scale_masks[prev_idx], sequence)
+                for prev_idx in range(scale_idx)
+            ):
                 continue
 
-            to_key = str(to_idx)
-            to_pos = __KEY_POSITIONS[to_idx]
-
-            for dir_feature in __get_directions__(compute_angle_deg(from_pos, to_pos), 22.5):
-                __DIR_TABLE[from_key][dir_feature].add(to_key)
-
-def __build_dis_table__():
-    global __DIS_TABLE, __KEY_POSITIONS, __DIS_GROUPS
+            candidate = "".join([characters[key] for key in sequence])
+            yield candidate
+
+            num_candidates += 1
+            if candidate == target or num_candidates == max_candidates:
+                return
+
+def __transition_scalings__(
+    input_points: list[tuple[float, float]],
+    layout: KeypadLayout,
+    delta_t: float
+) -> np.ndarray:
+    step_masks = __layout_step_masks__(input_points, layout, delta_t).astype(np.uint64)
+
+    key_bits = np.arange(step_masks.shape[-1], dtype=np.uint64)
+    scale_bits = np.left_shift(
+        np.ones(step_masks.shape[0], dtype=np.uint64),
+        np.arange(step_masks.shape[0], dtype=np.uint64)
+    )
+
+    accepts = (step_masks[:, :, :, np.newaxis] >> key_bits) & np.uint64(1)
+    return np.bitwise_or.reduce(
+        accepts * scale_bits[:, np.newaxis, np.newaxis, np.newaxis],
+        axis=0
+    )
+
+def count_quest_3_correlation(
+    input_points: list[tuple[float, float]],
+    delta_t: float = 14.5,
+    layout: KeypadLayout | str = "quest_3"
+) -> int:
+    layout = get_layout(layout)
 
-    __DIS_TABLE = {}
-    for from_idx in range(len(__KEY_POSITIONS)):
-        from_key = str(from_idx)
-        from_pos = __KEY_POSITIONS[from_idx]
-
-        __DIS_TABLE[from_key] = {}
-
-        for g_idx in range(len(__DIS_GROUPS)):
-            __DIS_TABLE[from_key][g_idx] = set()
+    match len(input_points):
+        case 0:
+            return 0
+        case 1:
+            return len(layout.get_characters())
 
-        for to_idx in range(len(__KEY_POSITIONS)):
-            to_key = str(to_idx)
-            to_pos = __KEY_POSITIONS[to_idx]
+    transitions: list[list[list[int]]] = __transition_scalings__(
+        input_points, layout, delta_t
+    ).tolist()
+    all_scalings: int = (1 << len(layout.get_scales())) - 1
 
-            for dis_feature in __get_distances__(compute_distance(from_pos, to_pos)):
-                __DIS_TABLE[from_key][dis_feature].add(to_key)
+    states: dict[tuple[int, int], int] = {
+        (key, all_scalings): 1 for key in range(len(transitions[0]))
+    }
 
-def quest_3_correlation(input_points: list[tuple[float, float]], delta_t: float = 14.5) -> list[str]:
-    global __DIR_TABLE, __DIS_TABLE, __DIS_GROUPS
+    for step_transitions in transitions:
+        new_states: dict[tuple[int, int], int] = {}
 
-    match len(input_points):
-        case 0:
-            return []
-        case 1:
-            return [str(val) for val in range(10)]
-        
-    if __DIR_TABLE is None:
-        __build_dir_table__()
+        for (key, scalings), count in states.items():
+            for next_key, next_scalings in enumerate(step_transitions[key]):
+                next_scalings &= scalings
+                if next_scalings == 0:
+                    continue
 
-    if __DIS_TABLE is None:
-        __build_dis_table__()
+                state = (next_key, next_scalings)
+                new_states[state] = new_states.get(state, 0) + count
 
-    candidates: set[str] = set()
-        
-    for scaled_points in __scale_points__(input_points):
-        cur_sequences: list[str] = [str(val) for val in range(10)]
-        for dir_features, dis_features in __feature_extraction__(scaled_points, delta_t):
-            new_sequences: list[str] = []
+        states = new_states
 
-            for sequence in cur_sequences:
-                last_key = sequence[-1]
+    return sum(states.values())
 
-                for dir_feature in dir_features:
-                    dir_keys: set[str] = __DIR_TABLE[last_key][dir_feature]
+def quest_3_correlation_contains(
+    input_points: list[tuple[float, float]],
+    sequence: str,
+    delta_t: float = 14.5,
+    layout: KeypadLayout | str = "quest_3"
+) -> bool:
+    layout = get_layout(layout)
+    characters = layout.get_characters()
 
-                    for dis_feature in dis_features:
-                        dis_keys: set[str] = __DIS_TABLE[last_key][dis_feature]
+    if len(sequence) != len(input_points) or not all(
+        character in characters for character in sequence
+    ):
+        return False
 
-                        for key in dir_keys.intersection(dis_keys):
-                            new_sequences.append(f"{sequence}{key}")
+    if len(input_points) <= 1:
+        return len(input_points) == 1
 
-            cur_sequences = new_sequences
+    transitions = __transition_scalings__(input_points, layout, delta_t)
+    keys = [characters.index(character) for character in sequence]
 
-        for sequence in cur_sequences:
-            candidates.add(sequence)    
-    
-    return list(candidates)
\ No newline at end of file
+    scalings = int(np.bitwise_and.reduce(
+        transitions[np.arange(len(keys) - 1), keys[:-1], keys[1:]]
+    ))
+    return scalings != 0
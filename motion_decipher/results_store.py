@@ -0,0 +1,242 @@
+import sqlite3
+from array import array
+from json import dumps, loads
+from os import remove
+from os.path import join
+from time import time
+from typing import BinaryIO, Generator, Iterable
+
+
+ResultRow = tuple[str, float, float, str, int, int, int | None, str, int, float]
+
+def pack_candidate(candidate: str) -> int:
+    if not candidate.isdigit() or len(candidate) > 18:
+        raise ValueError(f"Candidate '{candidate}' cannot be packed as a digit-encoded integer.")
+
+    return int(candidate)
+
+def pack_candidates(candidates: Iterable[str]) -> bytes:
+    packed = array("q")
+
+    for candidate in candidates:
+        packed.append(pack_candidate(candidate))
+
+    return packed.tobytes()
+
+def unpack_candidates(data: bytes | None, candidate_length: int) -> list[str]:
+    if data is None:
+        return []
+
+    packed = array("q")
+    packed.frombytes(data)
+
+    return [str(value).zfill(candidate_length) for value in packed]
+
+class CandidateSpool:
+    __spool_file: BinaryIO
+    __packed: array
+    __chunk_size: int
+
+    def __init__(self, spool_path: str, chunk_size: int = 65536):
+        self.__spool_file = open(spool_path, "wb")
+        self.__packed = array("q")
+        self.__chunk_size = chunk_size
+
+    def __enter__(self) -> "CandidateSpool":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def write(self, candidate: str):
+        self.__packed.append(pack_candidate(candidate))
+
+        if len(self.__packed) >= self.__chunk_size:
+            self.flush()
+
+    def flush(self):
+        self.__packed.tofile(self.__spool_file)
+        self.__packed = array("q")
+
+    def close(self):
+        if self.__spool_file.closed:
+            return
+
+        self.flush()
+        self.__spool_file.close()
+
+class ResultsStore:
+    __connection: sqlite3.Connection
+    __pending: list[ResultRow]
+    __pending_spools: list[tuple[str, str | None]]
+    __batch_size: int
+    __chunk_size: int
+
+    def __init__(self, store_path: str, batch_size: int = 64, chunk_size: int = 65536):
+        self.__pending = []
+        self.__pending_spools = []
+        self.__batch_size = batch_size
+        self.__chunk_size = chunk_size
+
+        self.__connection = sqlite3.connect(store_path, timeout=60.0)
+        self.__connection.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                pin TEXT PRIMARY KEY,
+                view_angle REAL NOT NULL,
+                delta_t REAL NOT NULL,
+                layout TEXT NOT NULL,
+                num_candidates INTEGER NOT NULL,
+                hit INTEGER NOT NULL,
+                rank INTEGER,
+                timings TEXT NOT NULL,
+                candidate_length INTEGER NOT NULL,
+                finished REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS candidate_chunks (
+                pin TEXT NOT NULL,
+                chunk_idx INTEGER NOT NULL,
+                candidates BLOB NOT NULL,
+                PRIMARY KEY (pin, chunk_idx)
+            );
+        """)
+        self.__connection.commit()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def add(
+        self,
+        pin: str,
+        view_angle: float,
+        delta_t: float,
+        layout: str,
+        num_candidates: int,
+        hit: bool,
+        rank: int | None,
+        timings: dict[str, float],
+        spool_path: str | None,
+        candidate_length: int
+    ) -> bool:
+        self.__pending.append((
+            pin,
+            view_angle,
+            delta_t,
+            layout,
+            num_candidates,
+            int(hit),
+            rank,
+            dumps(timings, sort_keys=True),
+            candidate_length,
+            time(),
+        ))
+        self.__pending_spools.append((pin, spool_path))
+
+        if len(self.__pending) < self.__batch_size:
+            return False
+
+        self.flush()
+        return True
+
+    def flush(self):
+        if len(self.__pending) == 0:
+            return
+
+        for pin, spool_path in self.__pending_spools:
+            self.__connection.execute("DELETE FROM candidate_chunks WHERE pin = ?", (pin,))
+
+            if spool_path is None:
+                continue
+
+            with open(spool_path, "rb") as spool_file:
+                chunk_idx: int = 0
+                while chunk := spool_file.read(8 * self.__chunk_size):
+                    self.__connection.execute(
+                        "INSERT INTO candidate_chunks VALUES (?, ?, ?)",
+                        (pin, chunk_idx, chunk)
+                    )
+                    chunk_idx += 1
+
+        self.__connection.executemany(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            self.__pending
+        )
+        self.__connection.commit()
+
+        for _, spool_path in self.__pending_spools:
+            if spool_path is not None:
+                remove(spool_path)
+
+        self.__pending = []
+        self.__pending_spools = []
+
+    def __iter_candidates__(self, pin: str, candidate_length: int) -> Generator[str, None, None]:
+        chunks = self.__connection.execute(
+            "SELECT candidates FROM candidate_chunks WHERE pin = ? ORDER BY chunk_idx",
+            (pin,)
+        )
+
+        for chunk, in chunks:
+            yield from unpack_candidates(chunk, candidate_length)
+
+    def get_pins(self) -> list[str]:
+        self.flush()
+        return [pin for pin, in self.__connection.execute("SELECT pin FROM results ORDER BY pin")]
+
+    def get_summary(self, pin: str) -> dict[str, object] | None:
+        self.flush()
+        row = self.__connection.execute(
+            "SELECT view_angle, delta_t, layout, num_candidates, hit, rank, timings "
+            "FROM results WHERE pin = ?",
+            (pin,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        view_angle, delta_t, layout, num_candidates, hit, rank, timings = row
+        return {
+            "pin": pin,
+            "view_angle": view_angle,
+            "delta_t": delta_t,
+            "layout": layout,
+            "num_candidates": num_candidates,
+            "hit": bool(hit),
+            "rank": rank,
+            "timings": loads(timings),
+        }
+
+    def get_candidates(self, pin: str) -> list[str]:
+        self.flush()
+        row = self.__connection.execute(
+            "SELECT candidate_length FROM results WHERE pin = ?",
+            (pin,)
+        ).fetchone()
+
+        if row is None:
+            return []
+
+        return list(self.__iter_candidates__(pin, row[0]))
+
+    def export_text(self, output_folder: str, only_hits: bool = True) -> int:
+        self.flush()
+        rows = self.__connection.execute(
+            "SELECT pin, hit, candidate_length FROM results ORDER BY pin"
+        ).fetchall()
+
+        num_exported: int = 0
+        for pin, hit, candidate_length in rows:
+            with open(join(output_folder, pin + ".txt"), "w") as out_file:
+                if hit or not only_hits:
+                    for candidate in self.__iter_candidates__(pin, candidate_length):
+                        out_file.write(candidate + "\n")
+
+            num_exported += 1
+
+        return num_exported
+
+    def close(self):
+        self.flush()
+        self.__connection.close()
@@ -0,0 +1,97 @@
+from hashlib import blake2b
+from json import dump, dumps, load
+from os import replace, stat
+from os.path import abspath, dirname, isfile
+from tempfile import NamedTemporaryFile
+from time import time
+from motion_decipher.landmark_cache import file_digest
+
+
+CaseEntry = dict[str, object]
+
+def inputs_digest(inputs: dict[str, object]) -> str:
+    return blake2b(dumps(inputs, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+class RunManifest:
+    __manifest_path: str | None
+    __cases: dict[str, CaseEntry]
+
+    __MANIFEST_VERSION: int = 1
+
+    def __init__(self, manifest_path: str | None):
+        self.__manifest_path = manifest_path
+        self.__cases = {}
+
+        if manifest_path is None or not isfile(manifest_path):
+            return
+
+        with open(manifest_path, "r") as manifest_file:
+            manifest = load(manifest_file)
+
+        if manifest.get("version") == self.__MANIFEST_VERSION:
+            self.__cases = manifest["cases"]
+
+    def is_complete(self, target_sequence: str, video_path: str, inputs: str) -> bool:
+        entry = self.__cases.get(target_sequence)
+        if entry is None or entry["status"] != "done" or entry["inputs"] != inputs:
+            return False
+
+        if entry["output"] is not None and not isfile(entry["output"]):
+            return False
+
+        video_stat = stat(video_path)
+        video = entry["video"]
+        if video["size"] == video_stat.st_size and video["mtime_ns"] == video_stat.st_mtime_ns:
+            return True
+
+        if video["size"] != video_stat.st_size or video["digest"] != file_digest(video_path):
+            return False
+
+        video["mtime_ns"] = video_stat.st_mtime_ns
+        return True
+
+    def record(
+        self,
+        target_sequence: str,
+        video_path: str,
+        video_digest: str | None,
+        inputs: str,
+        status: str,
+        output_path: str | None,
+        error: str | None = None
+    ):
+        video_stat = stat(video_path)
+
+        self.__cases[target_sequence] = {
+            "video": {
+                "path": abspath(video_path),
+                "size": video_stat.st_size,
+                "mtime_ns": video_stat.st_mtime_ns,
+                "digest": video_digest,
+            },
+            "inputs": inputs,
+            "status": status,
+            "output": output_path,
+            "error": error,
+            "finished": time(),
+        }
+
+    def get_entry(self, target_sequence: str) -> CaseEntry | None:
+        return self.__cases.get(target_sequence)
+
+    def save(self):
+        if self.__manifest_path is None:
+            return
+
+        with NamedTemporaryFile(
+            "w",
+            dir=dirname(abspath(self.__manifest_path)),
+            suffix=".tmp",
+            delete=False
+        ) as manifest_file:
+            dump({
+                "version": self.__MANIFEST_VERSION,
+                "cases": self.__cases,
+            }, manifest_file)
+
+        replace(manifest_file.name, self.__manifest_path)
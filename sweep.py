@@ -0,0 +1,157 @@
+from os import mkdir, listdir
+from os.path import join, isdir, dirname
+from multiprocessing import Pool, queues
+from motion_decipher import (
+    logger,
+    extract_triangles,
+    triangles_to_points,
+    PressManifest,
+    sweep_parameters,
+    write_sweep_table,
+    HandPoseEstimator,
+    LandmarkCache,
+    SweepCase,
+    get_transition_masks,
+    set_table_folder
+)
+
+
+"""
+Change the variable TEST_CASE_FOLDER to the relative path
+of the directory containing the 'videos' and 'keypresses'
+folders you'd like to sweep.
+
+Change the variable SWEEP_OUTPUT_FILE to the relative path of the
+CSV table holding one row per (PIN, viewing angle, delta_t).
+
+Change the variables VIEWING_ANGLES and DELTA_TS to the grid of
+horizontal viewing angles and correlation angle tolerances to evaluate.
+Each video is only decoded and pose estimated once for the whole grid.
+
+Change the variable MAX_PROCESSES to the value of 1 for a standard synchronous
+single-process sweep, or larger to extract videos and evaluate the grid in parallel.
+
+Change the variable LANDMARK_CACHE_PATH to the file used to cache hand
+landmarks between runs, or None to always re-run pose estimation.
+
+Change the variable PRESS_MANIFEST_PATH to the file indexing the press
+windows of every case, or None to rescan the 'keypresses' folder every run.
+
+Change the variable KEYPAD_LAYOUT to the name of the registered keypad
+layout the sweep correlates against, and LAYOUT_TABLE_FOLDER to the directory
+holding its compiled transition tables (None to compile them in memory).
+"""
+TEST_CASE_FOLDER: str = "./tests"
+SWEEP_OUTPUT_FILE: str = "./output/sweep.csv"
+VIEWING_ANGLES: list[float] = [float(angle) for angle in range(0, 100, 5)]
+DELTA_TS: list[float] = [10.0 + 1.5 * step for step in range(10)]
+MAX_PROCESSES: int = 10
+LANDMARK_CACHE_PATH: str | None = "./.landmark_cache.sqlite"
+LANDMARK_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+PRESS_MANIFEST_PATH: str | None = "./.press_manifest.json"
+KEYPAD_LAYOUT: str = "quest_3"
+LAYOUT_TABLE_FOLDER: str | None = "./.layout_tables"
+
+__estimator: HandPoseEstimator | None = None
+__cache: LandmarkCache | None = None
+
+def __init_worker__(log_queue: queues.Queue | None = None, log_level: int = logger.INFO):
+    global __estimator, __cache
+
+    if log_queue is not None:
+        logger.set_queue(log_queue, log_level)
+
+    if __estimator is None:
+        __estimator = HandPoseEstimator()
+
+    if __cache is None and LANDMARK_CACHE_PATH is not None:
+        __cache = LandmarkCache(LANDMARK_CACHE_PATH, LANDMARK_CACHE_MAX_BYTES)
+
+def extract_case(
+    videos_path: str,
+    video_filename: str,
+    presses: list[tuple[int, int]]
+) -> SweepCase | None:
+    if not video_filename.endswith(".mp4"):
+        return None
+
+    target_sequence = video_filename.replace(".mp4", "").strip()
+
+    __init_worker__()
+
+    triangles = extract_triangles(
+        join(videos_path, video_filename),
+        presses,
+        __estimator,
+        None,
+        __cache
+    )
+
+    if len(triangles) < 2:
+        logger.log_warning(f"Skipping Case {target_sequence}, Too Few Hand Poses...")
+        return None
+
+    logger.log_info(f"Extracted Case {target_sequence}.")
+    return target_sequence, triangles_to_points(triangles)
+
+def main():
+    videos_path: str = join(TEST_CASE_FOLDER, "videos")
+    keypresses_path: str = join(TEST_CASE_FOLDER, "keypresses")
+
+    set_table_folder(LAYOUT_TABLE_FOLDER)
+    get_transition_masks(KEYPAD_LAYOUT)
+
+    manifest = PressManifest(keypresses_path, PRESS_MANIFEST_PATH)
+    manifest.refresh()
+    manifest.save()
+
+    video_filenames = [
+        video_filename for video_filename in listdir(videos_path)
+        if video_filename.endswith(".mp4")
+    ]
+    video_filenames.sort()
+
+    arguments = [(
+        str(videos_path),
+        video_filename,
+        manifest.get_press_windows(video_filename.replace(".mp4", "").strip()),
+    ) for video_filename in video_filenames]
+
+    if MAX_PROCESSES <= 1:
+        extracted = [extract_case(*argument) for argument in arguments]
+    else:
+        with Pool(
+            processes=min(MAX_PROCESSES, len(arguments)),
+            initializer=__init_worker__,
+            initargs=(logger.get_queue(), logger.get_level())
+        ) as process_pool:
+            extracted = process_pool.starmap(extract_case, arguments)
+
+            process_pool.close()
+            process_pool.join()
+
+    cases: list[SweepCase] = [case for case in extracted if case is not None]
+
+    logger.log_info(
+        f"Sweeping {len(cases)} Cases Over "
+        f"{len(VIEWING_ANGLES)}x{len(DELTA_TS)} Parameters."
+    )
+
+    rows = sweep_parameters(cases, VIEWING_ANGLES, DELTA_TS, MAX_PROCESSES, KEYPAD_LAYOUT)
+    write_sweep_table(rows, SWEEP_OUTPUT_FILE)
+
+    logger.log_success(f"Wrote Sweep Results To {SWEEP_OUTPUT_FILE}.")
+
+
+if __name__ == "__main__":
+    logger.start_listener()
+
+    try:
+        output_folder = dirname(SWEEP_OUTPUT_FILE)
+        if output_folder != "" and not isdir(output_folder):
+            mkdir(output_folder)
+        main()
+    except Exception as e:
+        logger.log_error(f"{e}")
+    finally:
+        logger.stop_listener()